@@ -0,0 +1,71 @@
+# bench/bench_filtro.py
+# Aula simulada: cuantas tramas llegan a Python y cuantas propias se pierden
+# por cola llena, con filtro por software (hw_filter=False) y por hardware
+#
+# Uso:
+#   python bench/bench_filtro.py
+#   micropython bench/bench_filtro.py
+#
+# En el aire hay 3 actividades con 9 grupos cada una. Un contador del grupo 3
+# lee la radio cada LAZO tramas con receive_all(); entre lecturas las tramas
+# llegan a la cola de la radio de mentira (stubs/radio.py, tope QUEUE)
+import sys
+import random
+
+AQUI = sys.argv[0].rsplit('/', 1)[0] if '/' in sys.argv[0] else '.'
+sys.path.insert(0, AQUI + '/stubs')
+sys.path.insert(0, AQUI + '/..')
+
+import radio
+import microbitml
+
+N = 3000          # tramas en el aire
+LAZO = 12         # tramas que llegan entre dos lecturas del contador
+ACTIVIDADES = ('cqz', 'cnt', 'ppt')
+GRUPOS = 9
+
+
+def aire():
+    random.seed(1)
+    tramas = []
+    for _ in range(N):
+        act = ACTIVIDADES[random.getrandbits(8) % len(ACTIVIDADES)]
+        grp = random.getrandbits(8) % GRUPOS + 1
+        trama = bytes('\x01\x00\x01{}:CARRY_GR:{}:A:B'.format(act, grp), 'utf-8')
+        tramas.append((trama, act, grp))
+    return tramas
+
+
+def correr(hw_filter, tramas):
+    radio.limpiar()
+    rx = microbitml.Radio(activity='cnt', hw_filter=hw_filter)
+    rx.configure(group=3, role='B', hw_group=True)
+    leidas = [0]
+    tramas_py = rx._trama
+
+    def contar(raw, r, filter, full):
+        leidas[0] += 1
+        return tramas_py(raw, r, filter, full)
+    rx._trama = contar
+    validas = 0
+    for i, (trama, act, grp) in enumerate(tramas):
+        address = microbitml.direccion(act) if hw_filter else microbitml.DIR_BROADCAST
+        group = grp if hw_filter else 0
+        radio.llegar(trama, address, group)
+        if i % LAZO == LAZO - 1:
+            validas += len(rx.receive_all())
+    validas += len(rx.receive_all())
+    return leidas[0], validas, radio.perdidas
+
+
+def main():
+    tramas = aire()
+    propias = sum(1 for t in tramas if t[1] == 'cnt' and t[2] == 3)
+    print('Tramas en el aire: {}  propias (cnt grupo 3): {}'.format(N, propias))
+    print('{:<16}{:>12}{:>10}{:>10}'.format('filtro', 'en Python', 'validas', 'perdidas'))
+    for nombre, hw in (('software', False), ('hardware', True)):
+        leidas, validas, perdidas = correr(hw, tramas)
+        print('{:<16}{:>12}{:>10}{:>10}'.format(nombre, leidas, validas, perdidas))
+
+
+main()
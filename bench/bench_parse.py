@@ -0,0 +1,89 @@
+# bench/bench_parse.py
+# Mide memoria asignada por trama en Radio.receive(), por tipo de trama
+#
+# Uso:
+#   python bench/bench_parse.py [carpeta_con_microbitml ...]
+#   micropython bench/bench_parse.py [carpeta_con_microbitml ...]
+#
+# Sin argumentos mide el microbitml.py del repo. Para comparar contra otra
+# version:
+#   git show <commit>:microbitml.py > /tmp/viejo/microbitml.py
+#   python bench/bench_parse.py /tmp/viejo .
+#
+# En MicroPython se mide con el GC apagado: gc.mem_alloc() da los bytes exactos
+# asignados. En CPython se usa tracemalloc y se reporta el pico de memoria
+# transitoria por llamada (CPython libera al instante y no hay conteo total).
+import sys
+import gc
+
+AQUI = sys.argv[0].rsplit('/', 1)[0] if '/' in sys.argv[0] else '.'
+sys.path.insert(0, AQUI + '/stubs')
+
+import radio
+
+N = 2000
+
+CASOS = (
+    ('propio _DGR', b'\x01\x00\x01cqz:ANSWER_DGR:0011223344556677:3:B:A,C'),
+    ('propio _GR', b'\x01\x00\x01cqz:VALUE_GR:3:A:7'),
+    ('otra actividad', b'\x01\x00\x01cnt:CARRY_GR:3:A:B'),
+    ('otro grupo', b'\x01\x00\x01cqz:ANSWER_DGR:0011223344556677:5:B:A,C'),
+)
+
+
+def cargar_microbitml(carpeta):
+    sys.modules.pop('microbitml', None)
+    sys.path.insert(0, carpeta)
+    try:
+        return __import__('microbitml')
+    finally:
+        sys.path.pop(0)
+
+
+def _una(rx):
+    m = rx.receive()
+    if m.valid:
+        m.valores  # el handler pide los valores
+
+
+def medir(rx):
+    if hasattr(gc, 'mem_alloc'):
+        gc.collect()
+        gc.disable()
+        antes = gc.mem_alloc()
+        for _ in range(N):
+            _una(rx)
+        total = gc.mem_alloc() - antes
+        gc.enable()
+        return total / N
+    import tracemalloc
+    tracemalloc.start()
+    total = 0
+    for _ in range(N):
+        actual = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        _una(rx)
+        total += tracemalloc.get_traced_memory()[1] - actual
+    tracemalloc.stop()
+    return total / N
+
+
+def main():
+    carpetas = sys.argv[1:] or [AQUI + '/..']
+    print('{:<16}'.format('trama') + ''.join('{:>14}'.format(c[-14:]) for c in carpetas))
+    resultados = []
+    for carpeta in carpetas:
+        mbml = cargar_microbitml(carpeta)
+        rx = mbml.Radio(activity='cqz', channel=0)
+        rx.configure(group=3, role='B')
+        fila = []
+        for _, trama in CASOS:
+            radio.cargar([trama])
+            fila.append(medir(rx))
+        resultados.append(fila)
+    for i in range(len(CASOS)):
+        print('{:<16}'.format(CASOS[i][0]) + ''.join('{:>14.1f}'.format(f[i]) for f in resultados))
+    print('(bytes asignados por trama)')
+
+
+main()
@@ -0,0 +1,133 @@
+# bench/bench_rtt.py
+# Ida y vuelta POLL -> ANSWER por el concentrador, en el simulador: la PC escribe
+# el POLL por USB y mide cuanto tarda en leer el ANSWER de ese estudiante
+#
+# Uso:
+#   python bench/bench_rtt.py
+#   python bench/bench_rtt.py --estudiantes 12 --rondas 10
+#   python bench/bench_rtt.py --concentrador /tmp/viejo/concentrador.py
+#   python bench/bench_rtt.py --barrido          # POLL_ALL: barrido completo en el concentrador
+#
+# Solo CPython (usa simulador/). Cada estudiante arranca con un grupo/rol propio.
+# Los tiempos son del eter (ms virtuales) y se comparan contra el timeout de
+# polling de la interfaz (500 ms).
+import argparse
+import json
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from simulador.aula import Aula
+
+ACTIVITY = 'cqz'
+ROLES    = ['A', 'B', 'C', 'D', 'E', 'Z']
+TIMEOUT_POLL = 500     # ms: POLL_TIMEOUT de socketio_manager
+
+
+def _percentil(datos, p):
+    if not datos:
+        return 0.0
+    datos = sorted(datos)
+    return datos[min(len(datos) - 1, int(p * len(datos)))]
+
+
+def _esperar_answer(con, eter, dev_id, hasta):
+    # Lineas hasta el ANSWER de dev_id; retorna el instante (ms del eter) o None
+    while eter.ahora() < hasta:
+        linea = con.leer_usb(timeout=0.005)
+        if not linea or not linea.startswith(('{', '[')):
+            continue
+        try:
+            datos = json.loads(linea)
+        except ValueError:
+            continue
+        for msg in datos if isinstance(datos, list) else [datos]:
+            if msg.get('name') == 'ANSWER' and msg.get('devID') == dev_id:
+                return eter.ahora()
+    return None
+
+
+def barrido(con, eter, destinos, rondas):
+    # POLL_ALL con el roster completo; mide hasta el poll_end
+    roster = [f"{grp}:{rol}" for _, grp, rol in destinos]
+    for _ in range(rondas):
+        inicio = eter.ahora()
+        for i in range(0, len(roster), 8):
+            con.escribir_uart(json.dumps({'name': 'POLL_ALL', 'act': ACTIVITY,
+                                          'valores': [str(i), str(len(roster))] + roster[i:i + 8]},
+                                         separators=(',', ':')) + '\n')
+        respuestas, fin = 0, None
+        while fin is None and eter.ahora() - inicio < 10000:
+            linea = con.leer_usb(timeout=0.005)
+            if not linea or not linea.startswith(('{', '[')):
+                continue
+            datos = json.loads(linea)
+            for msg in datos if isinstance(datos, list) else [datos]:
+                if msg.get('name') == 'ANSWER':
+                    respuestas += 1
+                elif msg.get('event') == 'poll_end':
+                    fin = msg
+        dur = eter.ahora() - inicio
+        sin = len(fin['sin_respuesta']) if fin else len(roster)
+        print(f"barrido {len(roster)} estudiantes: {dur:.0f} ms  respuestas={respuestas}  sin respuesta={sin}")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog='python bench/bench_rtt.py',
+                                description='RTT POLL -> ANSWER del concentrador en el simulador')
+    p.add_argument('--estudiantes', type=int, default=6)
+    p.add_argument('--rondas', type=int, default=5)
+    p.add_argument('--perdida', type=float, default=0.0)
+    p.add_argument('--concentrador', default=os.path.join(RAIZ, 'mbClassquiz', 'concentrador.py'))
+    p.add_argument('--barrido', action='store_true', help='medir POLL_ALL en lugar de POLL de a uno')
+    args = p.parse_args(argv)
+
+    aula = Aula(eco=False, perdida=args.perdida, semilla=1)
+    con = aula.agregar(args.concentrador, nombre='con')[0]
+    estudiantes = aula.agregar(os.path.join(RAIZ, 'mbClassquiz', 'classquiz.py'), copias=args.estudiantes)
+    destinos = []
+    for i, est in enumerate(estudiantes):
+        grp, rol = i // len(ROLES) + 1, ROLES[i % len(ROLES)]
+        # Config en formato viejo (sin _seq): ConfigManager la acepta igual
+        with open(os.path.join(est.carpeta, 'config.cfg'), 'w') as f:
+            f.write(f"role={rol}\ngrupo={grp}\n")
+        destinos.append((est.uid.hex(), grp, rol))
+
+    aula.correr(2500)          # arranque: pantallas y CHECK_REG
+    while con.leer_usb(timeout=0.05) is not None:
+        pass
+
+    eter = aula.eter
+    if args.barrido:
+        barrido(con, eter, destinos, args.rondas)
+        aula.detener()
+        return 0
+    rtts, perdidos = [], 0
+    t0 = time.monotonic()
+    for _ in range(args.rondas):
+        for dev_id, grp, rol in destinos:
+            poll = {'name': 'POLL', 'act': ACTIVITY, 'devID': dev_id, 'grp': grp, 'rol': rol, 'valores': []}
+            inicio = eter.ahora()
+            con.escribir_uart(json.dumps(poll, separators=(',', ':')) + '\n')
+            llegada = _esperar_answer(con, eter, dev_id, inicio + 2 * TIMEOUT_POLL)
+            if llegada is None:
+                perdidos += 1
+            else:
+                rtts.append(llegada - inicio)
+    total = time.monotonic() - t0
+    aula.detener()
+
+    tarde = sum(1 for r in rtts if r > TIMEOUT_POLL)
+    print(f"{os.path.relpath(args.concentrador, RAIZ)} | {args.estudiantes} estudiantes x {args.rondas} rondas")
+    print(f"RTT p50={_percentil(rtts, 0.5):.1f} ms p95={_percentil(rtts, 0.95):.1f} ms "
+          f"max={max(rtts) if rtts else 0:.1f} ms")
+    print(f"sin respuesta={perdidos}  mas de {TIMEOUT_POLL} ms={tarde}  "
+          f"sondeos/s={len(destinos) * args.rondas / total:.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,266 @@
+# bench/bench_serial.py
+# Latencia de ingreso de core/serial_manager.py: un concentrador falso escribe
+# lineas JSON en una pty y se mide cuanto tardan en llegar al callback de la app
+#
+# Uso:
+#   python bench/bench_serial.py
+#   python bench/bench_serial.py --mensajes 500 --rafaga 30
+#   python bench/bench_serial.py --modulo /tmp/viejo/serial_manager.py
+#
+# Solo CPython en Linux/macOS (pty) y con pyserial instalado. Mide:
+#   - latencia: un mensaje por vez, de la escritura en la pty al callback
+#   - rafaga: N lineas ID escritas juntas, hasta que llega la ultima
+#   - saturado: lineas ANSWER al ritmo de BAUDIOS durante unos segundos; la PC
+#     tiene que seguir el ritmo del cable sin acumular atraso
+#   - maximo: lineas ANSWER escritas sin pausa, mensajes/s que procesa la PC
+#   - escritura: comandos POLL de la PC (enviar) mientras entran ANSWER sin
+#     pausa: de la llamada a enviar() hasta que el concentrador falso los lee,
+#     y cuanto queda bloqueado quien llama
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+import tty
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INTERFAZ = os.path.join(RAIZ, 'mbClassquiz', 'Interface_grafica')
+sys.path.insert(0, INTERFAZ)
+
+from core import config
+
+BAUDIOS = 115200
+BYTES_S = BAUDIOS / 10        # 8N1: 10 bits por byte
+
+
+def _percentil(datos, p):
+    if not datos:
+        return 0.0
+    datos = sorted(datos)
+    return datos[min(len(datos) - 1, int(p * len(datos)))]
+
+
+def cargar_modulo(ruta):
+    if ruta is None:
+        from core import serial_manager
+        return serial_manager
+    # Versiones anteriores leen la pausa del loop de config
+    if not hasattr(config, 'USB_READ_INTERVAL'):
+        config.USB_READ_INTERVAL = 0.05
+    spec = importlib.util.spec_from_file_location('serial_manager_bench', ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def linea_id(i):
+    return json.dumps({'name': 'ID', 'act': 'cqz', 'devID': '{:016x}'.format(0x5100000000000000 + i),
+                       'grp': i // 6 + 1, 'rol': 'ABCDEZ'[i % 6], 'valores': []},
+                      separators=(',', ':')) + '\n'
+
+
+def linea_answer(i):
+    return json.dumps({'name': 'ANSWER', 'act': 'cqz', 'devID': '{:016x}'.format(0x5100000000000000 + i % 30),
+                       'grp': i % 30 // 6 + 1, 'rol': 'ABCDEZ'[i % 6], 'valores': ['A', 'C']},
+                      separators=(',', ':')) + '\n'
+
+
+def escribir_a_ritmo(fd, bloque, bytes_s):
+    # Escribe en trozos de ~10 ms respetando la velocidad del cable
+    trozo = max(1, int(bytes_s / 100))
+    t0 = time.perf_counter()
+    for i in range(0, len(bloque), trozo):
+        espera = t0 + i / bytes_s - time.perf_counter()
+        if espera > 0:
+            time.sleep(espera)
+        os.write(fd, bloque[i:i + trozo])
+
+
+def escribir_todo(fd, bloque):
+    # La pty tiene un buffer chico: os.write bloquea hasta que la PC lee
+    vista = memoryview(bloque)
+    while vista:
+        n = os.write(fd, vista)
+        vista = vista[n:]
+
+
+class Salida:
+    """Lee lo que escribe la PC en la pty y anota cuando llega cada POLL."""
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.llegadas = {}
+        self.activo = True
+        threading.Thread(target=self._leer, daemon=True).start()
+
+    def _leer(self):
+        buf = b''
+        while self.activo:
+            try:
+                buf += os.read(self.fd, 4096)
+            except OSError:
+                return
+            t = time.perf_counter()
+            *lineas, buf = buf.split(b'\n')
+            for linea in lineas:
+                try:
+                    msg = json.loads(linea)
+                except ValueError:
+                    continue
+                if msg.get('name') == 'POLL':
+                    self.llegadas[int(msg['valores'][0])] = t
+
+    def esperar(self, indices, timeout=5.0):
+        limite = time.perf_counter() + timeout
+        while time.perf_counter() < limite and not all(i in self.llegadas for i in indices):
+            time.sleep(0.0005)
+
+
+def inundar(fd, detener):
+    # ANSWER sin pausa hasta que se pida parar
+    bloque = ''.join(linea_answer(i) for i in range(500)).encode()
+    while not detener.is_set():
+        escribir_todo(fd, bloque)
+
+
+def poll(i):
+    return {'name': 'POLL', 'act': 'cqz', 'grp': 1, 'rol': 'A', 'valores': [str(i)]}
+
+
+class Medidor:
+    def __init__(self):
+        self.llegadas = []
+        self.evento = threading.Event()
+        self.esperados = 0
+
+    def callback(self, msg):
+        self.llegadas.append(time.perf_counter())
+        if len(self.llegadas) >= self.esperados:
+            self.evento.set()
+
+    def esperar(self, n, timeout=10.0):
+        self.llegadas = []
+        self.esperados = n
+        self.evento.clear()
+        return self.evento
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog='python bench/bench_serial.py',
+                                description='Latencia de lectura de serial_manager sobre una pty')
+    p.add_argument('--mensajes', type=int, default=200)
+    p.add_argument('--rafaga', type=int, default=30)
+    p.add_argument('--rondas', type=int, default=5)
+    p.add_argument('--saturado', type=float, default=3.0, help='segundos de enlace saturado')
+    p.add_argument('--maximo', type=int, default=20000, help='lineas escritas sin pausa')
+    p.add_argument('--comandos', type=int, default=200, help='POLL enviados con trafico entrante')
+    p.add_argument('--modulo', default=None, help='otro serial_manager.py para comparar')
+    args = p.parse_args(argv)
+
+    sm = cargar_modulo(args.modulo)
+    maestro, esclavo = os.openpty()
+    tty.setraw(esclavo)
+    medidor = Medidor()
+    sm.registrar_callback(medidor.callback)
+    if not sm.conectar(os.ttyname(esclavo)):
+        return 1
+    sm.iniciar_loop()
+    os.read(maestro, 4096)       # pedido de modo: el concentrador falso sigue en JSON
+
+    latencias = []
+    for i in range(args.mensajes):
+        listo = medidor.esperar(1)
+        t0 = time.perf_counter()
+        os.write(maestro, linea_id(i).encode())
+        if listo.wait(2.0):
+            latencias.append((medidor.llegadas[0] - t0) * 1000.0)
+        time.sleep(0.002)
+
+    rafagas = []
+    bloque = ''.join(linea_id(i) for i in range(args.rafaga)).encode()
+    for _ in range(args.rondas):
+        listo = medidor.esperar(args.rafaga)
+        t0 = time.perf_counter()
+        os.write(maestro, bloque)
+        if listo.wait(10.0):
+            rafagas.append((medidor.llegadas[-1] - t0) * 1000.0)
+        time.sleep(0.05)
+
+    # Enlace saturado: tantas lineas como entran en --saturado segundos
+    largo = len(linea_answer(0))
+    n_sat = int(args.saturado * BYTES_S / largo)
+    bloque = ''.join(linea_answer(i) for i in range(n_sat)).encode()
+    listo = medidor.esperar(n_sat)
+    t0 = time.perf_counter()
+    escribir_a_ritmo(maestro, bloque, BYTES_S)
+    t_fin = time.perf_counter()
+    listo.wait(10.0)
+    sat_recibidos = len(medidor.llegadas)
+    sat_atraso = (medidor.llegadas[-1] - t_fin) * 1000.0 if medidor.llegadas else 0.0
+    sat_dur = (medidor.llegadas[-1] - t0) if medidor.llegadas else 0.0
+    time.sleep(0.1)
+
+    # Sin pausa: cuanto procesa la PC
+    bloque = ''.join(linea_answer(i) for i in range(args.maximo)).encode()
+    listo = medidor.esperar(args.maximo)
+    t0 = time.perf_counter()
+    escritor = threading.Thread(target=escribir_todo, args=(maestro, bloque), daemon=True)
+    escritor.start()
+    listo.wait(60.0)
+    max_dur = (medidor.llegadas[-1] - t0) if medidor.llegadas else 0.0
+    max_recibidos = len(medidor.llegadas)
+    escritor.join()
+
+    # PC -> concentrador con la lectura ocupada: POLL de a uno y en rafaga
+    salida = Salida(maestro)
+    detener = threading.Event()
+    medidor.esperar(10 ** 9)
+    inundador = threading.Thread(target=inundar, args=(maestro, detener), daemon=True)
+    inundador.start()
+    time.sleep(0.2)
+    enviados, bloqueos = {}, []
+    for i in range(args.comandos):
+        t0 = time.perf_counter()
+        sm.enviar(poll(i))
+        enviados[i] = t0
+        bloqueos.append((time.perf_counter() - t0) * 1000.0)
+        time.sleep(0.005)
+    salida.esperar(range(args.comandos))
+    lat_tx = [(salida.llegadas[i] - t0) * 1000.0 for i, t0 in enviados.items() if i in salida.llegadas]
+    base = args.comandos
+    t0 = time.perf_counter()
+    for i in range(base, base + args.rafaga):
+        sm.enviar(poll(i))
+    t_llamadas = (time.perf_counter() - t0) * 1000.0
+    salida.esperar(range(base, base + args.rafaga))
+    ultimas = [salida.llegadas[i] for i in range(base, base + args.rafaga) if i in salida.llegadas]
+    t_rafaga_tx = (max(ultimas) - t0) * 1000.0 if ultimas else 0.0
+    entrantes = len(medidor.llegadas)
+    detener.set()
+    salida.activo = False
+
+    sm.desconectar()
+    os.close(maestro)
+    print(f"{args.modulo or 'core/serial_manager.py'}")
+    print(f"latencia {len(latencias)}/{args.mensajes}: p50={_percentil(latencias, 0.5):.3f} ms "
+          f"p95={_percentil(latencias, 0.95):.3f} ms max={max(latencias) if latencias else 0:.3f} ms")
+    print(f"rafaga de {args.rafaga} lineas ({len(rafagas)}/{args.rondas}): "
+          f"p50={_percentil(rafagas, 0.5):.2f} ms max={max(rafagas) if rafagas else 0:.2f} ms")
+    print(f"saturado {BAUDIOS} baudios: {sat_recibidos}/{n_sat} mensajes, "
+          f"{sat_recibidos / sat_dur if sat_dur else 0:.0f} msg/s (cable {BYTES_S / largo:.0f} msg/s), "
+          f"atraso al final {sat_atraso:.2f} ms")
+    print(f"maximo: {max_recibidos}/{args.maximo} mensajes en {max_dur:.2f} s = "
+          f"{max_recibidos / max_dur if max_dur else 0:.0f} msg/s "
+          f"({max_recibidos * largo / max_dur / BYTES_S if max_dur else 0:.1f}x el cable)")
+    print(f"escritura con {entrantes} ANSWER entrando: {len(lat_tx)}/{args.comandos} POLL "
+          f"p50={_percentil(lat_tx, 0.5):.3f} ms p95={_percentil(lat_tx, 0.95):.3f} ms "
+          f"max={max(lat_tx) if lat_tx else 0:.3f} ms; enviar() bloquea p50={_percentil(bloqueos, 0.5):.3f} ms "
+          f"max={max(bloqueos) if bloqueos else 0:.3f} ms")
+    print(f"rafaga de {args.rafaga} POLL: llamadas {t_llamadas:.2f} ms, ultimo en el concentrador {t_rafaga_tx:.2f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,254 @@
+# bench/bench_suite.py
+# Micro-benchmarks de los caminos por trama: operaciones por segundo y bytes
+# asignados por llamada (no cantidad de asignaciones), con baseline guardado
+# para detectar regresiones
+#
+# Uso:
+#   python bench/bench_suite.py                  # medir
+#   python bench/bench_suite.py --guardar        # medir y guardar el baseline
+#   python bench/bench_suite.py --comparar       # medir y comparar contra el baseline
+#   micropython bench/bench_suite.py [...]
+#
+# Opciones: --n N (iteraciones de tiempo), --tolerancia 0.3 (caida de ops/s
+# aceptada), --solo texto (solo los casos que contienen texto).
+#
+# Hay un baseline por implementacion (bench/baseline_cpython.json,
+# bench/baseline_micropython.json) y por maquina, por eso no se versiona.
+# --comparar sale con codigo 1 si algun caso es mas lento que la tolerancia o
+# asigna mas bytes por llamada que el baseline.
+import sys
+import gc
+import json
+
+AQUI = sys.argv[0].rsplit('/', 1)[0] if '/' in sys.argv[0] else '.'
+sys.path.insert(0, AQUI + '/stubs')
+sys.path.insert(0, AQUI + '/..')
+
+import radio
+import microbitml
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+IMPL = sys.implementation.name
+BASELINE = AQUI + '/baseline_{}.json'.format(IMPL)
+CFG = 'bench_cfg.cfg'
+N_MEM = 200
+
+
+def _opcion(nombre, defecto):
+    if nombre in sys.argv:
+        return sys.argv[sys.argv.index(nombre) + 1]
+    return defecto
+
+
+# Carga el firmware del concentrador sin la llamada final a run()
+def cargar_concentrador():
+    with open(AQUI + '/../mbClassquiz/concentrador.py') as f:
+        lineas = [l for l in f.read().split('\n')
+                  if l.startswith(' ') or not l.rstrip().endswith('.run()')]
+    ns = {'__name__': 'concentrador'}
+    exec('\n'.join(lineas), ns)
+    return ns
+
+
+# json_a_radio antes del tokenizador de una pasada (campos_json): una busqueda
+# por campo sobre toda la linea y limpieza de comillas al final
+def json_legado(linea):
+    def extraer(campo, texto):
+        marca = '"{}":'.format(campo)
+        idx = texto.find(marca)
+        if idx == -1:
+            return None
+        inicio = idx + len(marca)
+        if texto[inicio] == '"':
+            fin = texto.index('"', inicio + 1)
+            return texto[inicio + 1:fin]
+        elif texto[inicio] == '[':
+            fin = texto.index(']', inicio)
+            return texto[inicio:fin + 1]
+        else:
+            fin = inicio
+            while fin < len(texto) and texto[fin] not in (',', '}'):
+                fin += 1
+            return texto[inicio:fin].strip()
+
+    name   = extraer("name",   linea)
+    act    = extraer("act",    linea)
+    devid  = extraer("devID",  linea)
+    grp    = extraer("grp",    linea)
+    rol    = extraer("rol",    linea)
+    valores_raw = extraer("valores", linea)
+    valores = []
+    if valores_raw and valores_raw != "[]":
+        inner = valores_raw.strip("[]").replace('"', '')
+        valores = inner.split(',')
+    name  = name.strip('"')  if name  else name
+    act   = act.strip('"')   if act   else act
+    devid = devid.strip('"') if devid else devid
+    rol   = rol.strip('"')   if rol   else rol
+    return name, act, devid, grp, rol, valores
+
+
+def casos():
+    rx = microbitml.Radio(activity='cqz', channel=0)
+    rx.configure(group=3, role='B')
+    tx = microbitml.Radio(activity='cqz', channel=0)
+    tx.configure(group=3, role='A')
+    txb = microbitml.Radio(activity='cqz', channel=0, binary=True)
+    txb.configure(group=3, role='A')
+    txb.send('ANSWER', ['A', 'C'], device_id=True, packed=True)
+    binaria = radio.ultima
+
+    def recibir():
+        m = rx.receive()
+        if m.valid:
+            m.valores  # el handler pide los valores
+
+    def trama(t):
+        return lambda: radio.cargar([t])
+
+    firmware = cargar_concentrador()
+    con = firmware['Concentrador']()
+    radio_a_json = firmware['radio_a_json']
+    msg = microbitml.Message()
+    msg.name, msg.act, msg.devID, msg.grp, msg.rol = 'ANSWER', 'cqz', '0011223344556677', '3', 'B'
+    msg.valores = ['A', 'C']
+    linea = '{"name":"ACK","act":"cqz","devID":"0011223344556677","grp":3,"rol":"B","valores":[]}'
+    roster = '{"name":"POLL_ALL","act":"cqz","valores":["0","30","1:A","1:B","1:C","1:D","1:E","1:Z","2:A","2:B"]}'
+
+    cfg = microbitml.ConfigManager(config_file=CFG, extra_fields={'valor': 0})
+    cfg.flush()
+    estado = [0]
+
+    def guardar():
+        estado[0] ^= 1
+        cfg.set('valor', estado[0])
+        cfg.save()
+
+    return (
+        ('receive _DGR', trama(b'\x01\x00\x01cqz:ANSWER_DGR:0011223344556677:3:B:A,C'), recibir),
+        ('receive _GR', trama(b'\x01\x00\x01cqz:VALUE_GR:3:A:7'), recibir),
+        ('receive sin sufijo', trama(b'\x01\x00\x01cqz:PING:7'), recibir),
+        ('receive binaria', trama(binaria), recibir),
+        ('receive otra act', trama(b'\x01\x00\x01cnt:CARRY_GR:3:A:B'), recibir),
+        ('receive otro grupo', trama(b'\x01\x00\x01cqz:ANSWER_DGR:0011223344556677:5:B:A,C'), recibir),
+        ('cmd _DGR', None, lambda: tx.cmd('ANSWER_DGR', ['A', 'C'], device_id=True, gr=True, packed=True)),
+        ('_build', None, lambda: tx._build('VALUE_GR', '3', 'A', 7)),
+        ('send texto', None, lambda: tx.send('ANSWER', ['A', 'C'], device_id=True, packed=True)),
+        ('send binario', None, lambda: txb.send('ANSWER', ['A', 'C'], device_id=True, packed=True)),
+        ('config load', None, cfg.load),
+        ('config save', None, guardar),
+        ('config save igual', None, cfg.save),
+        ('radio_a_json', None, lambda: radio_a_json(msg)),
+        ('json_a_radio', None, lambda: con.json_a_radio(linea)),
+        ('json campos', None, lambda: con.campos_json(linea)),
+        ('json campos legado', None, lambda: json_legado(linea)),
+        ('json campos roster', None, lambda: con.campos_json(roster)),
+        ('json roster legado', None, lambda: json_legado(roster)),
+    )
+
+
+# Mejor de 3 corridas: lo mas estable entre ejecuciones
+def medir_tiempo(op, n):
+    for _ in range(10):
+        op()
+    mejor = 0.0
+    for _ in range(3):
+        t0 = ticks_us()
+        for _ in range(n):
+            op()
+        dt = ticks_diff(ticks_us(), t0)
+        if dt > 0:
+            mejor = max(mejor, n * 1000000.0 / dt)
+    return mejor
+
+
+def medir_memoria(op):
+    if hasattr(gc, 'mem_alloc'):
+        gc.collect()
+        gc.disable()
+        antes = gc.mem_alloc()
+        for _ in range(N_MEM):
+            op()
+        total = gc.mem_alloc() - antes
+        gc.enable()
+        return total / N_MEM
+    import tracemalloc
+    tracemalloc.start()
+    total = 0
+    for _ in range(N_MEM):
+        actual = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        op()
+        total += tracemalloc.get_traced_memory()[1] - actual
+    tracemalloc.stop()
+    return total / N_MEM
+
+
+def main():
+    n = int(_opcion('--n', 5000))
+    tolerancia = float(_opcion('--tolerancia', 0.3))
+    solo = _opcion('--solo', '')
+    base = {}
+    if '--comparar' in sys.argv:
+        try:
+            with open(BASELINE) as f:
+                base = json.load(f)
+        except OSError:
+            print('Sin baseline en {}: correr primero con --guardar'.format(BASELINE))
+            return 1
+    print('{} | {} iteraciones'.format(IMPL, n))
+    print('{:<20}{:>12}{:>12}{:>12}{:>12}'.format('caso', 'ops/s', 'B/llamada', 'base ops/s', 'base B/ll.'))
+    resultados = {}
+    fallas = []
+    try:
+        for nombre, preparar, op in casos():
+            if solo not in nombre:
+                continue
+            if preparar:
+                preparar()
+            # Las operaciones de flash son mucho mas lentas: menos iteraciones
+            ops = medir_tiempo(op, n // 20 if nombre.startswith('config') else n)
+            mem = medir_memoria(op)
+            resultados[nombre] = {'ops': round(ops, 1), 'bytes': round(mem, 1)}
+            linea = '{:<20}{:>12.0f}{:>12.1f}'.format(nombre, ops, mem)
+            b = base.get(nombre)
+            if b:
+                linea += '{:>12.0f}{:>12.1f}'.format(b['ops'], b['bytes'])
+                if ops < b['ops'] * (1 - tolerancia):
+                    fallas.append('{}: {:.0f} ops/s (baseline {:.0f})'.format(nombre, ops, b['ops']))
+                    linea += '  LENTO'
+                if mem > b['bytes'] * 1.1 + 16:
+                    fallas.append('{}: {:.1f} B/llamada (baseline {:.1f})'.format(nombre, mem, b['bytes']))
+                    linea += '  BYTES'
+            print(linea)
+    finally:
+        try:
+            import os
+            os.remove(CFG)
+            os.remove(CFG + '.2')
+        except (OSError, AttributeError):
+            pass
+    if '--guardar' in sys.argv:
+        with open(BASELINE, 'w') as f:
+            json.dump(resultados, f)
+        print('Baseline guardado en {}'.format(BASELINE))
+    if fallas:
+        print('Regresiones:')
+        for f in fallas:
+            print('  ' + f)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,3 @@
+# bench/stubs/machine.py
+def unique_id():
+    return b'\x00\x11\x22\x33\x44\x55\x66\x77'
@@ -0,0 +1,73 @@
+# bench/stubs/microbit.py
+# Reemplazo minimo del modulo microbit para correr microbitml fuera del hardware
+# Compatible con CPython y con el port unix de MicroPython
+import time
+
+
+class _Display:
+    def show(self, *args, **kwargs):
+        pass
+
+    def scroll(self, *args, **kwargs):
+        pass
+
+    def clear(self):
+        pass
+
+    def set_pixel(self, x, y, v):
+        pass
+
+
+display = _Display()
+
+
+def sleep(ms):
+    pass
+
+
+def running_time():
+    try:
+        return time.ticks_ms()
+    except AttributeError:
+        return int(time.time() * 1000)
+
+
+# Lo que usan los firmwares de actividad con "from microbit import *"
+class Image:
+    HEART = HAPPY = SAD = YES = NO = DUCK = ARROW_E = ARROW_W = None
+
+    def __init__(self, *args):
+        pass
+
+
+class _Boton:
+    def is_pressed(self):
+        return False
+
+    def was_pressed(self):
+        return False
+
+
+class _Pin:
+    def is_touched(self):
+        return False
+
+
+class _Uart:
+    def init(self, *args, **kwargs):
+        pass
+
+    def any(self):
+        return False
+
+    def readline(self):
+        return None
+
+    def write(self, datos):
+        pass
+
+
+button_a = _Boton()
+button_b = _Boton()
+pin0 = pin1 = pin2 = pin_logo = _Pin()
+uart = _Uart()
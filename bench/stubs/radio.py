@@ -0,0 +1,95 @@
+# bench/stubs/radio.py
+# Radio de mentira: entrega una y otra vez las tramas cargadas con cargar()
+# Las tramas se guardan ya armadas para que la lectura no asigne memoria
+# Con llegar() las tramas pasan por una cola como la del micro:bit: filtro de
+# direccion y grupo por hardware y tope de cola
+
+_tramas = []
+_textos = []
+_idx = 0
+enviadas = 0
+ultima = None      # ultima trama enviada con send_bytes
+
+# Estado de config() y de la cola de llegar()
+_address = 0x75626974
+_group = 0
+_queue = 3
+_cola = []
+descartadas = 0    # filtradas por hardware (direccion o grupo)
+perdidas = 0       # cola llena
+
+
+def cargar(tramas):
+    global _tramas, _textos, _idx
+    _tramas = list(tramas)
+    _textos = [str(t[3:], 'utf-8') if t[:3] == b'\x01\x00\x01' else None for t in _tramas]
+    _idx = 0
+
+
+def _siguiente():
+    global _idx
+    if not _tramas:
+        return None
+    i = _idx
+    _idx = (i + 1) % len(_tramas)
+    return i
+
+
+def on():
+    pass
+
+
+def off():
+    pass
+
+
+def config(**kwargs):
+    global _address, _group, _queue
+    _address = kwargs.get('address', _address)
+    _group = kwargs.get('group', _group)
+    _queue = kwargs.get('queue', _queue)
+
+
+# Una trama llega por el aire con su direccion y grupo de radio
+def llegar(trama, address=0x75626974, group=0):
+    global descartadas, perdidas
+    if address != _address or group != _group:
+        descartadas += 1
+    elif len(_cola) >= _queue:
+        perdidas += 1
+    else:
+        _cola.append(trama)
+
+
+def limpiar():
+    global descartadas, perdidas
+    del _cola[:]
+    descartadas = 0
+    perdidas = 0
+
+
+def reset():
+    pass
+
+
+def send(msg):
+    global enviadas
+    enviadas += 1
+
+
+def send_bytes(msg):
+    global enviadas, ultima
+    enviadas += 1
+    ultima = msg
+
+
+def receive():
+    i = _siguiente()
+    return None if i is None else _textos[i]
+
+
+def receive_bytes():
+    if _cola:
+        return _cola.pop(0)
+    i = _siguiente()
+    return None if i is None else _tramas[i]
@@ -6,7 +6,7 @@ from flask import Blueprint, render_template, request, jsonify
 from flask_socketio import emit
 from core.base_app import BaseApp
 from core.server import socketio
-from core import serial_manager, utils
+from core import config, serial_manager, utils
 
 # Defaults propios de classquiz
 DEFAULT_URL     = 'http://localhost:8000'
@@ -17,6 +17,17 @@ ALUMNOS_FILE    = 'data/alumnos.csv'
 
 ACTIVITY = 'cqz'
 
+# Turnos de descubrimiento: cada micro:bit responde el REPORT en su turno
+# (grupo-1) * len(ROLES) + indice del rol, igual que ConfigManager.slot()
+ROLES                 = ['A', 'B', 'C', 'D', 'E', 'Z']
+GRUPOS_MAX            = 9
+SLOT_MS               = 20     # ancho de turno anunciado en el REPORT
+MARGEN_DESCUBRIMIENTO = 1.5    # segundos extra tras el ultimo turno o el ultimo ID recibido
+TROZO_REGISTRO        = 4      # dispositivos por linea REG_SET
+
+# Contadores de radio que devuelve cada micro:bit en STATV (microbitml.STATV_CAMPOS)
+STATV_CAMPOS = ['tx', 'rx', 'descartados', 'cola_llena', 'retransmisiones', 'fallidos', 'duplicados']
+
 class ClassquizApp(BaseApp):
     id    = "classquiz"
     label = "🌐 ClassQuiz"
@@ -29,6 +40,8 @@ class ClassquizApp(BaseApp):
             'dispositivos': {},
         }
         self.lock = Lock()
+        # Fin del descubrimiento en curso (time.monotonic); cada ID lo corre
+        self._fin_descubrimiento = 0
         # importar aqui para evitar circular
         from apps.classquiz import socketio_manager as sm
         self.sm = sm
@@ -103,6 +116,7 @@ class ClassquizApp(BaseApp):
                                 'grp': a['grp'], 'rol': a['rol'],
                                 'estado': 'registrado', 'cliente': None, 'conectado': False
                             }
+                self._enviar_registro()
                 socketio.emit('config_cargada', {
                     'url': self.estado['url'], 'pin': self.estado['pin'],
                     'timeout': self.estado['timeout'], 'alumnos': alumnos
@@ -164,6 +178,11 @@ class ClassquizApp(BaseApp):
             self._conectar_classquiz()
             return jsonify({'status': 'ok'})
 
+        @bp.route('/api/stats', methods=['POST'])
+        def pedir_stats():
+            self._pedir_stats()
+            return jsonify({'status': 'ok'})
+
         @bp.route('/api/dispositivos', methods=['GET'])
         def dispositivos():
             with self.lock:
@@ -197,12 +216,15 @@ class ClassquizApp(BaseApp):
 
     def on_start(self):
         self._cargar_config()
+        self._enviar_registro()
         print("[ClassQuiz] Iniciado")
 
     def on_stop(self):
         self.sm.desconectar_todos(self.estado)
         with self.lock:
             self.estado['dispositivos'].clear()
+        # Sin la app los CHECK_REG vuelven a pasar por la PC
+        serial_manager.enviar({'name': 'REG_SET', 'act': ACTIVITY, 'valores': []})
         print("[ClassQuiz] Detenido")
 
     def on_message(self, msg: dict):
@@ -212,10 +234,17 @@ class ClassquizApp(BaseApp):
         if event == 'gateway_ready':
             socketio.emit('log', {'nivel': 'INFO', 'msg': 'Gateway listo',
                                   'timestamp': utils.timestamp()})
+            self._enviar_registro()
         elif event == 'button_a':
             self._iniciar_descubrimiento()
         elif event == 'button_b':
             self._verificar_estado()
+        elif event in ('poll_start', 'poll_end'):
+            self.sm.notify_barrido(msg)
+        elif event == 'tally':
+            self._procesar_tally(msg)
+        elif event == 'check_reg':
+            self._procesar_reg_local(msg)
         elif name == 'ID':
             self._procesar_id(msg)
         elif name == 'ANSWER':
@@ -224,21 +253,50 @@ class ClassquizApp(BaseApp):
             self._procesar_pong(msg)
         elif name == 'CHECK_REG':
             self._procesar_check_reg(msg)
+        elif name == 'STATV':
+            self._procesar_stats(msg)
 
     # ------------------------------------------------------------------
     # Lógica de negocio
     # ------------------------------------------------------------------
 
+    def _calcular_slots(self):
+        """Turnos a anunciar: todos los grupos x roles (o hasta el ultimo grupo/rol
+        conocido, si es mayor), asi tambien tiene turno quien no estaba en el roster."""
+        total = GRUPOS_MAX * len(ROLES)
+        with self.lock:
+            conocidos = list(self.estado['dispositivos'].values())
+        for v in conocidos:
+            try:
+                slot = (int(v['grp']) - 1) * len(ROLES) + ROLES.index(v['rol'])
+            except (ValueError, TypeError):
+                continue
+            total = max(total, slot + 1)
+        return total
+
     def _iniciar_descubrimiento(self):
+        slots = self._calcular_slots()
         with self.lock:
             self.estado['dispositivos'].clear()
+        # Roster vacio: el concentrador lo completa con los ACK del descubrimiento
+        self._enviar_registro()
         socketio.emit('log', {'nivel': 'INFO', 'msg': 'Descubrimiento iniciado',
                               'timestamp': utils.timestamp()})
         serial_manager.enviar({'name': 'REPORT', 'act': ACTIVITY,
-                               'grp': 0, 'rol': 'est', 'valores': []})
+                               'grp': 0, 'rol': 'est',
+                               'valores': [str(SLOT_MS), str(slots)]})
+        with self.lock:
+            self._fin_descubrimiento = time.monotonic() + slots * SLOT_MS / 1000 + MARGEN_DESCUBRIMIENTO
 
         def esperar_ids():
-            time.sleep(10)
+            # Quien tiene un turno mas alla de los anunciados (grupo fuera del
+            # roster) contesta despues de la ventana: se espera mientras lleguen IDs
+            while True:
+                with self.lock:
+                    resto = self._fin_descubrimiento - time.monotonic()
+                if resto <= 0:
+                    break
+                time.sleep(resto)
             with self.lock:
                 total = len(self.estado['dispositivos'])
             socketio.emit('discovery_end', {'total': total})
@@ -254,16 +312,29 @@ class ClassquizApp(BaseApp):
         rol       = msg.get('rol')
         clave     = (grp, rol)
 
+        # Un grupo/rol es del primero que lo registra (la misma regla que Registro
+        # en el concentrador): el segundo no se registra y recibe CONFLICT
         with self.lock:
-            if clave in {(v['grp'], v['rol']) for v in self.estado['dispositivos'].values()}:
-                socketio.emit('log', {'nivel': 'WARNING',
-                                      'msg': f'Conflicto G{grp}:{rol}',
-                                      'timestamp': utils.timestamp()})
-            self.estado['dispositivos'][device_id] = {
-                'device_id': device_id, 'grp': grp, 'rol': rol,
-                'nombre': device_id[:8], 'estado': 'registrado',
-                'cliente': None, 'conectado': False
-            }
+            self._fin_descubrimiento = max(self._fin_descubrimiento,
+                                           time.monotonic() + MARGEN_DESCUBRIMIENTO)
+            dispositivos = self.estado['dispositivos']
+            duenio = next((d for d, v in dispositivos.items()
+                           if (v['grp'], v['rol']) == clave and d != device_id), None)
+            if duenio is None:
+                dispositivos.pop(device_id, None)
+                dispositivos[device_id] = {
+                    'device_id': device_id, 'grp': grp, 'rol': rol,
+                    'nombre': device_id[:8], 'estado': 'registrado',
+                    'cliente': None, 'conectado': False
+                }
+
+        if duenio is not None:
+            socketio.emit('log', {'nivel': 'WARNING',
+                                  'msg': f'Conflicto G{grp}:{rol}: ya registrado por {duenio[:8]}',
+                                  'timestamp': utils.timestamp()})
+            serial_manager.enviar({'name': 'REG_STATUS', 'act': ACTIVITY, 'devID': device_id,
+                                   'grp': grp, 'rol': rol, 'valores': ['CONFLICT']})
+            return
 
         serial_manager.enviar({'name': 'ACK', 'act': ACTIVITY, 'devID': device_id,
                                 'grp': grp, 'rol': rol, 'valores': []})
@@ -276,11 +347,28 @@ class ClassquizApp(BaseApp):
         with self.lock:
             info = self.estado['dispositivos'].get(device_id, {})
         nombre = info.get('nombre', device_id[:8] if device_id else '?')
+        self.sm.notify_answer(device_id)
         socketio.emit('respuesta_recibida', {'device_id': device_id,
                                              'nombre': nombre, 'respuesta': respuesta,
                                              'timestamp': utils.timestamp()})
         self.sm.enviar_respuesta(device_id, respuesta, self.estado)
 
+    def _procesar_tally(self, msg):
+        """Conteo del concentrador: histograma al log y los ANSWER que faltaron."""
+        votos   = msg.get('votos') or {}
+        resumen = ' '.join(f'{k}={v}' for k, v in sorted(votos.items())) or 'sin votos'
+        socketio.emit('log', {'nivel': 'INFO',
+                              'msg': f"Votos: {resumen} ({msg.get('n', 0)} respuestas)",
+                              'timestamp': utils.timestamp()})
+        with self.lock:
+            por_clave = {f"{info.get('grp')}:{info.get('rol')}": device_id
+                         for device_id, info in self.estado['dispositivos'].items()}
+        for clave, respuesta in (msg.get('respuestas') or {}).items():
+            device_id = por_clave.get(clave)
+            if device_id and not self.sm.ya_respondio(device_id):
+                self._procesar_answer({'devID': device_id, 'valores': respuesta.split(',')})
+        self.sm.notify_tally()
+
     def _procesar_pong(self, msg):
         device_id = msg.get('devID')
         with self.lock:
@@ -303,6 +391,31 @@ class ClassquizApp(BaseApp):
         serial_manager.enviar({'name': 'REG_STATUS', 'act': ACTIVITY, 'devID': device_id,
                                 'grp': grp, 'rol': rol, 'valores': [estado_reg]})
 
+    def _enviar_registro(self):
+        """Pasa el roster registrado al concentrador (REG_SET) para que conteste
+        los CHECK_REG sin ida y vuelta por USB."""
+        with self.lock:
+            entradas = [f"{info['grp']}:{info['rol']}:{device_id}"
+                        for device_id, info in self.estado['dispositivos'].items()]
+        for i in range(0, max(len(entradas), 1), TROZO_REGISTRO):
+            serial_manager.enviar({'name': 'REG_SET', 'act': ACTIVITY,
+                                   'valores': [str(i), str(len(entradas))] + entradas[i:i + TROZO_REGISTRO]},
+                                  pausa=config.PAUSA_TROZO)
+
+    def _procesar_reg_local(self, msg):
+        """CHECK_REG que el concentrador ya contesto: solo llegan los cambios de estado."""
+        device_id = msg.get('devID')
+        estado_reg = msg.get('estado')
+        with self.lock:
+            info = self.estado['dispositivos'].get(device_id)
+            if info and estado_reg == 'OK':
+                info['estado'] = 'online'
+        nombre = info.get('nombre', device_id[:8]) if info else (device_id or '?')[:8]
+        nivel  = 'WARNING' if estado_reg == 'CONFLICT' else 'INFO'
+        socketio.emit('log', {'nivel': nivel,
+                              'msg': f"CHECK_REG {nombre} G{msg.get('grp')}:{msg.get('rol')}: {estado_reg}",
+                              'timestamp': utils.timestamp()})
+
     def _verificar_estado(self):
         with self.lock:
             dispositivos = list(self.estado['dispositivos'].items())
@@ -310,6 +423,29 @@ class ClassquizApp(BaseApp):
             serial_manager.enviar({'name': 'PING', 'act': ACTIVITY, 'devID': device_id,
                                    'grp': info['grp'], 'rol': info['rol'], 'valores': []})
 
+    def _pedir_stats(self):
+        with self.lock:
+            dispositivos = list(self.estado['dispositivos'].items())
+        for device_id, info in dispositivos:
+            serial_manager.enviar({'name': 'STATS', 'act': ACTIVITY, 'devID': device_id,
+                                   'grp': info['grp'], 'rol': info['rol'], 'valores': []})
+
+    def _procesar_stats(self, msg):
+        # STATV viaja sin devID (no entraria en una trama): se busca por grupo y rol
+        try:
+            stats = dict(zip(STATV_CAMPOS, (int(v) for v in msg.get('valores', []))))
+        except ValueError:
+            return
+        with self.lock:
+            device_id = next((d for d, v in self.estado['dispositivos'].items()
+                              if str(v['grp']) == str(msg.get('grp')) and v['rol'] == msg.get('rol')),
+                             None)
+            if device_id is None:
+                return
+            self.estado['dispositivos'][device_id]['stats'] = stats
+        socketio.emit('radio_stats', {'device_id': device_id, 'stats': stats,
+                                      'timestamp': utils.timestamp()})
+
     def _conectar_classquiz(self):
         self.sm.desconectar_todos(self.estado)
         self.sm.conectar_todos(self.estado)
@@ -11,11 +11,42 @@ _opciones_actuales = []
 # device_id -> Event, señalizado cuando llega el ANSWER durante el polling
 _eventos_respuesta = {}
 
+# POLL_ALL: el concentrador confirma el inicio (poll_start) y avisa el final (poll_end)
+_barrido_inicio = Event()
+_barrido_fin    = Event()
+_barrido_result = {}
+
+# TALLY: conteo del concentrador al final del barrido, para completar los ANSWER
+# que no llegaron por USB
+_conteo      = Event()
+_respondidos = set()     # device_id con ANSWER ya procesado en la pregunta actual
+
+POLL_TIMEOUT    = 0.25    # segundos por intento: POLL_TIMEOUT_MS del concentrador
+POLL_REINTENTOS = 2       # POLL_REINTENTOS del concentrador
+TROZO_ROSTER    = 8       # estudiantes por linea POLL_ALL
+
 def notify_answer(device_id):
     """Llamado por app.py cuando llega un ANSWER durante el polling activo."""
+    _respondidos.add(device_id)
     if device_id in _eventos_respuesta:
         _eventos_respuesta[device_id].set()
 
+def notify_barrido(msg):
+    """Llamado por app.py con los eventos poll_start / poll_end del concentrador."""
+    if msg.get('event') == 'poll_start':
+        _barrido_inicio.set()
+    else:
+        _barrido_result.clear()
+        _barrido_result.update(msg)
+        _barrido_fin.set()
+
+def notify_tally():
+    """Llamado por app.py despues de procesar el evento tally."""
+    _conteo.set()
+
+def ya_respondio(device_id):
+    return device_id in _respondidos
+
 
 def conectar_dispositivo(device_id, info, url, pin, estado):
     nombre  = info.get('nombre', device_id[:8])
@@ -71,6 +102,8 @@ def conectar_dispositivo(device_id, info, url, pin, estado):
             'rol': 'est',
             'valores': [tipo, str(num_opciones)]
         })
+        # El concentrador reinicia su conteo con el QPARAMS
+        _respondidos.clear()
         socketio.emit('log', {
             'nivel': 'INFO',
             'msg': f'Pregunta {_pregunta_actual}: {tipo}, {num_opciones} opciones',
@@ -116,6 +149,56 @@ def conectar_dispositivo(device_id, info, url, pin, estado):
 
 
 def _hacer_polling(estado):
+    """
+    Pasa el roster al concentrador con POLL_ALL y espera el poll_end.
+    El concentrador sondea a cada uno con su propio timeout y reintentos; los
+    ANSWER llegan como siempre mientras tanto. Al terminar pide el conteo
+    (TALLY) y app.py completa las respuestas que no llegaron por USB. Si el concentrador no confirma
+    el inicio (firmware viejo), sondea desde la PC de a un dispositivo.
+    """
+    from core import config, serial_manager, utils
+    from core.server import socketio
+
+    print("[Votacion] Iniciando polling...")
+    socketio.emit('log', {'nivel': 'INFO', 'msg': 'Polling iniciado',
+                          'timestamp': utils.timestamp()})
+
+    dispositivos = list(estado['dispositivos'].items())
+    nombres = {f"{info.get('grp')}:{info.get('rol')}": info.get('nombre', device_id[:8])
+               for device_id, info in dispositivos}
+    roster  = list(nombres)
+
+    _barrido_inicio.clear()
+    _barrido_fin.clear()
+    for i in range(0, max(len(roster), 1), TROZO_ROSTER):
+        serial_manager.enviar({'name': 'POLL_ALL', 'act': ACTIVITY,
+                               'valores': [str(i), str(len(roster))] + roster[i:i + TROZO_ROSTER]},
+                              pausa=config.PAUSA_TROZO)
+
+    if not _barrido_inicio.wait(timeout=1.0):
+        print("[Votacion] El concentrador no soporta POLL_ALL, polling desde la PC")
+        _polling_por_dispositivo(estado, dispositivos)
+    else:
+        espera = len(roster) * POLL_TIMEOUT * (POLL_REINTENTOS + 1) + 2
+        if not _barrido_fin.wait(timeout=espera):
+            print("[Votacion] El concentrador no informo el fin del polling")
+        for clave in _barrido_result.get('sin_respuesta', []):
+            nombre = nombres.get(clave, clave)
+            print(f"[Votacion] Sin respuesta de {nombre} G{clave}")
+            socketio.emit('log', {'nivel': 'WARNING',
+                                  'msg': f'Sin respuesta: {nombre} (G{clave})',
+                                  'timestamp': utils.timestamp()})
+        _conteo.clear()
+        serial_manager.enviar({'name': 'TALLY', 'act': ACTIVITY, 'valores': []})
+        if not _conteo.wait(timeout=1.0):
+            print("[Votacion] El concentrador no envio el conteo")
+
+    socketio.emit('log', {'nivel': 'INFO', 'msg': 'Polling completo',
+                          'timestamp': utils.timestamp()})
+    print("[Votacion] Polling completo")
+
+
+def _polling_por_dispositivo(estado, dispositivos):
     """
     Recorre todos los dispositivos enviando POLL por grp+rol.
     Espera activamente el ANSWER con timeout y reintento por dispositivo.
@@ -127,12 +210,6 @@ def _hacer_polling(estado):
     TIMEOUT_RESPUESTA = 0.5   # segundos de espera por respuesta
     MAX_INTENTOS      = 1
 
-    print("[Votacion] Iniciando polling...")
-    socketio.emit('log', {'nivel': 'INFO', 'msg': 'Polling iniciado',
-                          'timestamp': utils.timestamp()})
-
-    dispositivos = list(estado['dispositivos'].items())
-
     for device_id, info in dispositivos:
         grp    = info.get('grp')
         rol    = info.get('rol')
@@ -163,10 +240,6 @@ def _hacer_polling(estado):
         # Limpiar event
         _eventos_respuesta.pop(device_id, None)
 
-    socketio.emit('log', {'nivel': 'INFO', 'msg': 'Polling completo',
-                          'timestamp': utils.timestamp()})
-    print("[Votacion] Polling completo")
-
 
 def conectar_todos(estado):
     url = estado['url']
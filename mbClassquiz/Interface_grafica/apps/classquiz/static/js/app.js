@@ -105,6 +105,13 @@ socket.on('respuesta_recibida', (data) => {
     actualizarRespuestaEnLista(data.device_id, data.nombre, data.respuesta);
 });
 
+socket.on('radio_stats', (data) => {
+    if (state.dispositivos[data.device_id]) {
+        state.dispositivos[data.device_id].stats = data.stats;
+        actualizarTablaDispositivos();
+    }
+});
+
 socket.on('countdown', (data) => {
     actualizarCountdown(data.segundos);
 });
@@ -195,7 +202,7 @@ function actualizarTablaDispositivos() {
     const dispositivos = Object.entries(state.dispositivos);
 
     if (dispositivos.length === 0) {
-        tbody.innerHTML = '<tr><td colspan="6" class="text-center text-muted">No hay dispositivos registrados</td></tr>';
+        tbody.innerHTML = '<tr><td colspan="7" class="text-center text-muted">No hay dispositivos registrados</td></tr>';
         return;
     }
 
@@ -252,11 +259,30 @@ function actualizarTablaDispositivos() {
         tdActividad.className = 'text-center';
         tdActividad.innerHTML = `<span class="badge bg-success">${info.actividad || '?'}</span>`;
 
-        tr.append(tdId, tdNombre, tdGrupo, tdRole, tdEstado, tdActividad);
+        const tdRadio = document.createElement('td');
+        tdRadio.className = 'text-center small';
+        tdRadio.appendChild(celdaStats(info.stats));
+
+        tr.append(tdId, tdNombre, tdGrupo, tdRole, tdEstado, tdActividad, tdRadio);
         tbody.appendChild(tr);
     });
 }
 
+// Resumen de los contadores de radio: enviadas / recibidas / descartadas,
+// con el detalle completo en el tooltip
+function celdaStats(stats) {
+    const span = document.createElement('span');
+    if (!stats) {
+        span.className   = 'text-muted';
+        span.textContent = '—';
+        return span;
+    }
+    span.textContent = `↑${stats.tx} ↓${stats.rx} ✗${stats.descartados}`;
+    span.title = Object.entries(stats).map(([k, v]) => `${k}: ${v}`).join('\n');
+    if (stats.cola_llena || stats.fallidos) span.className = 'text-danger';
+    return span;
+}
+
 function actualizarEstadisticas() {
     const total     = Object.keys(state.dispositivos).length;
     const conectados = Object.values(state.dispositivos).filter(d => d.conectado || d.estado === 'online').length;
@@ -401,6 +427,17 @@ document.getElementById('conectar-classquiz-btn').addEventListener('click', asyn
     }
 });
 
+document.getElementById('stats-radio-btn').addEventListener('click', async () => {
+    agregarLog('INFO', 'Pidiendo estadísticas de radio...');
+    try {
+        const response = await fetch(`${BASE}/api/stats`, { method: 'POST' });
+        const data     = await response.json();
+        if (data.status !== 'ok') throw new Error(data.error || 'Error desconocido');
+    } catch (error) {
+        agregarLog('ERROR', `Error pidiendo estadísticas: ${error.message}`);
+    }
+});
+
 document.getElementById('descubrir-btn').addEventListener('click', async () => {
     agregarLog('INFO', 'Iniciando descubrimiento...');
     try {
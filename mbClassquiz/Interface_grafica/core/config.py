@@ -4,6 +4,10 @@ FLASK_PORT         = 5000
 SECRET_KEY         = 'microbit-proxy-fundacion-sadosky'
 BAUDRATE           = 115200
 SERIAL_TIMEOUT     = 1
-USB_READ_INTERVAL  = 0.05
+ESPERA_LECTURA     = 0.5     # segundos maximos bloqueado esperando datos del puerto
+COLA_ENTRADA       = 1000    # mensajes leidos que esperan al callback
+COLA_SALIDA        = 1000    # mensajes de enviar() que esperan al hilo de escritura
+PAUSA_TROZO        = 0.02    # segundos entre lineas largas seguidas (REG_SET, POLL_ALL): ~14 ms de cable + parseo
+SERIAL_BINARIO     = True    # pedir tramas binarias (COBS + CRC) al concentrador
 MAX_DISPOSITIVOS   = 30
 DATA_DIR           = 'data'
\ No newline at end of file
@@ -2,18 +2,29 @@
 import serial
 import serial.tools.list_ports
 import json
+import queue
+import select
 import time
 import threading
 from threading import Lock
 
 from core import config
+from core import tramas
 
 _puerto_serial   = None
 _puerto_nombre   = None          # guarda el nombre del puerto para reconexión
-_puerto_lock     = Lock()
+_puerto_lock     = Lock()         # protege _puerto_serial (abrir/cerrar), no la lectura ni la escritura
 _callback        = None
 _loop_activo     = False         # True mientras el loop de lectura debe correr
 _loop_lock       = Lock()
+_binario         = False         # True cuando el concentrador acepto tramas binarias
+_separador       = tramas.Separador()
+_tramas_invalidas = 0            # tramas binarias descartadas por CRC o formato
+_salidas_perdidas = 0            # mensajes de enviar() que no llegaron al puerto
+# Mensajes leidos que esperan al callback: el lector no espera a las apps
+_entrantes       = queue.Queue(maxsize=config.COLA_ENTRADA)
+# Bytes listos para escribir: enviar() no espera al puerto ni al lector
+_salientes       = queue.Queue(maxsize=config.COLA_SALIDA)
 
 # Cuántas veces reintentar reconexión y cada cuántos segundos
 REINTENTOS_MAX   = 10
@@ -44,21 +55,45 @@ def detectar_puertos():
             for p in serial.tools.list_ports.comports()]
 
 def conectar(puerto):
-    global _puerto_serial, _puerto_nombre
+    global _puerto_serial, _puerto_nombre, _binario, _separador
+    # Lo encolado para el puerto anterior ya no va, y lo leido de el ya no se despacha
+    _vaciar(_salientes, "sin enviar del puerto anterior")
+    _vaciar(_entrantes, None)
     try:
         with _puerto_lock:
             if _puerto_serial and _puerto_serial.is_open:
                 _puerto_serial.close()
             _puerto_serial = serial.Serial(puerto, config.BAUDRATE, timeout=config.SERIAL_TIMEOUT)
             _puerto_nombre = puerto
+            _binario       = False
+            _separador     = tramas.Separador()
             time.sleep(2)
+        _iniciar_hilos()
         print(f"[Serial] Conectado a {puerto}")
         _notificar_estado(True, puerto)
+        _pedir_modo()
         return True
     except Exception as e:
         print(f"[Serial] Error conectando: {e}")
         return False
 
+def _vaciar(cola, motivo):
+    """Descarta lo que haya en la cola; con motivo, lo cuenta como salida perdida."""
+    n = 0
+    try:
+        while True:
+            cola.get_nowait()
+            n += 1
+    except queue.Empty:
+        pass
+    if n and motivo:
+        _salida_perdida(n, motivo)
+
+def _salida_perdida(n, motivo):
+    global _salidas_perdidas
+    _salidas_perdidas += n
+    print(f"[Serial] {n} mensaje(s) descartado(s): {motivo}. Van {_salidas_perdidas}")
+
 def desconectar():
     global _puerto_serial, _puerto_nombre, _loop_activo
     with _loop_lock:
@@ -81,38 +116,171 @@ def esta_conectado():
     except Exception:
         return False
 
-def enviar(data):
+def _pedir_modo():
+    """Pide al concentrador el formato del enlace. Hasta que confirma se habla JSON;
+    un concentrador viejo ignora el pedido y todo sigue en JSON."""
+    enviar({'usb': 'bin' if config.SERIAL_BINARIO else 'txt'})
+
+def enviar(data, pausa=0):
+    """Codifica el mensaje en el formato negociado y lo deja en la cola de
+    salida. Retorna False si no hay puerto o la cola esta llena. True no
+    garantiza la escritura: si el puerto se cae antes, el hilo de escritura
+    lo descarta y lo informa (ver _salida_perdida).
+    pausa: segundos que el hilo de escritura espera despues de este mensaje,
+    para que el concentrador lea una linea larga antes de que llegue la otra."""
     if not esta_conectado():
         return False
     try:
-        with _puerto_lock:
-            _puerto_serial.write((json.dumps(data, separators=(',', ':')) + '\n').encode('utf-8'))
-            _puerto_serial.flush()
+        trama = tramas.codificar(data) if _binario else None
+        if not trama:
+            trama = (json.dumps(data, separators=(',', ':')) + '\n').encode('utf-8')
+        _salientes.put_nowait((trama, pausa))
         return True
+    except queue.Full:
+        _salida_perdida(1, "cola de salida llena")
+        return False
     except Exception as e:
         print(f"[Serial] Error enviando: {e}")
         return False
 
+def _loop_escritura():
+    """Escribe lo encolado por enviar(). Lo que se junto mientras el puerto
+    estaba ocupado sale en una sola escritura, hasta un mensaje con pausa."""
+    while True:
+        trama, pausa = _salientes.get()
+        datos = [trama]
+        while not pausa:
+            try:
+                trama, pausa = _salientes.get_nowait()
+            except queue.Empty:
+                break
+            datos.append(trama)
+        with _puerto_lock:
+            puerto = _puerto_serial
+        if puerto is None:
+            # enviar() ya retorno True: que quede registrado que no salieron
+            _salida_perdida(len(datos), "puerto cerrado")
+            continue
+        try:
+            puerto.write(b''.join(datos))
+        except Exception as e:
+            _salida_perdida(len(datos), f"error escribiendo ({e})")
+        if pausa:
+            time.sleep(pausa)
+
 class ErrorHardwareSerial(Exception):
     """Se lanza cuando el puerto serial detecta un error de hardware (desconexión física)."""
     pass
 
+def _error_lectura(e):
+    if isinstance(e, serial.SerialException):
+        raise ErrorHardwareSerial(str(e))
+    # PermissionError en Windows indica desconexión física
+    if isinstance(e, PermissionError) or 'ClearCommError' in str(e) or 'PermissionError' in str(e):
+        raise ErrorHardwareSerial(str(e))
+    print(f"[Serial] Error leyendo: {e}")
+
 def leer():
-    if not esta_conectado():
-        return None
+    """Lee de una vez todo lo que hay en el puerto y lo agrega al separador.
+    Retorna la cantidad de bytes leidos."""
+    with _puerto_lock:
+        puerto = _puerto_serial
+    if puerto is None or not puerto.is_open:
+        return 0
     try:
-        with _puerto_lock:
-            if _puerto_serial.in_waiting > 0:
-                linea = _puerto_serial.readline().decode('utf-8', errors='ignore').strip()
-                return linea if linea else None
-    except serial.SerialException as e:
-        raise ErrorHardwareSerial(str(e))
+        n = puerto.in_waiting
+        if n > 0:
+            _separador.agregar(puerto.read(n))
+        return n
     except Exception as e:
-        # PermissionError en Windows indica desconexión física
-        if isinstance(e, PermissionError) or 'ClearCommError' in str(e) or 'PermissionError' in str(e):
-            raise ErrorHardwareSerial(str(e))
-        print(f"[Serial] Error leyendo: {e}")
-    return None
+        _error_lectura(e)
+    return 0
+
+def _abrir(item):
+    """Mensajes de un item del separador: linea JSON (uno o un arreglo) o trama."""
+    global _tramas_invalidas
+    tipo, datos = item
+    if tipo == 'txt':
+        return _parsear(datos)
+    try:
+        return [tramas.decodificar(tramas.abrir(datos))]
+    except tramas.TramaInvalida as e:
+        _tramas_invalidas += 1
+        print(f"[Serial] Trama descartada ({e}), van {_tramas_invalidas}")
+        return []
+
+def _parsear(linea):
+    try:
+        msg = json.loads(linea)
+    except json.JSONDecodeError:
+        print(f"[Serial] JSON invalido: {linea}")
+        return []
+    # El concentrador agrupa varios mensajes en un arreglo JSON
+    return msg if isinstance(msg, list) else [msg]
+
+def leer_mensajes():
+    """Mensajes completos disponibles como dicts. Las lineas JSON y las tramas
+    binarias se separan del mismo buffer, sea cual sea el formato negociado."""
+    if not esta_conectado():
+        return []
+    leer()
+    mensajes = []
+    for item in _separador.todos():
+        mensajes.extend(_abrir(item))
+    return mensajes
+
+def _negociar(msg):
+    """Atiende la negociacion del formato en el hilo lector, antes de leer lo
+    que sigue. Retorna True si el mensaje no va a las apps."""
+    global _binario
+    if isinstance(msg, dict):
+        event = msg.get('event')
+        if event == 'usb':
+            _binario = msg.get('modo') == 'bin'
+            print(f"[Serial] Enlace en modo {'binario' if _binario else 'JSON'}")
+            return True
+        if event == 'gateway_ready':
+            # El concentrador se reinicio: vuelve a JSON hasta renegociar
+            _binario = False
+            _pedir_modo()
+        elif event == 'usb_crc':
+            print("[Serial] El concentrador descarto una trama por CRC")
+            return True
+    return False
+
+def _despachar(msg):
+    if _callback:
+        _callback(msg)
+
+def _esperar_datos(timeout):
+    """Bloquea hasta que el puerto tenga datos o pase timeout. Retorna True si hay datos."""
+    with _puerto_lock:
+        puerto = _puerto_serial
+    if puerto is None:
+        return False
+    try:
+        fd = puerto.fileno()
+    except (AttributeError, OSError):
+        fd = None
+    if fd is None:
+        # Windows: pyserial no expone un descriptor para select
+        limite = time.monotonic() + timeout
+        while puerto.in_waiting == 0:
+            if time.monotonic() >= limite:
+                return False
+            time.sleep(0.001)
+        return True
+    listos, _, _ = select.select([fd], [], [], timeout)
+    return bool(listos)
+
+def _loop_despacho():
+    """Pasa los mensajes leidos al callback de la app activa."""
+    while True:
+        msg = _entrantes.get()
+        try:
+            _despachar(msg)
+        except Exception as e:
+            print(f"[Serial] Error en callback: {e}")
 
 def _forzar_cierre():
     """Cierra el puerto sin modificar _loop_activo ni _puerto_nombre."""
@@ -147,14 +315,17 @@ def loop_lectura():
 
         if esta_conectado():
             try:
-                linea = leer()
-                if linea and _callback:
-                    try:
-                        msg = json.loads(linea)
-                        _callback(msg)
-                    except json.JSONDecodeError:
-                        print(f"[Serial] JSON invalido: {linea}")
-                time.sleep(config.USB_READ_INTERVAL)
+                # Sin pausa fija: el hilo duerme en select hasta que llega algo y
+                # entonces lee todas las lineas completas que haya
+                if not _esperar_datos(config.ESPERA_LECTURA):
+                    continue
+                while True:
+                    mensajes = leer_mensajes()
+                    if not mensajes:
+                        break
+                    for msg in mensajes:
+                        if not _negociar(msg):
+                            _entrantes.put(msg)
             except ErrorHardwareSerial as e:
                 print(f"[Serial] Desconexion fisica detectada: {e}")
                 _forzar_cierre()
@@ -191,6 +362,18 @@ def loop_lectura():
 
     print("[Serial] Loop de lectura finalizado")
 
+_hilos_iniciados = False
+
+def _iniciar_hilos():
+    """Hilos de despacho y de escritura: uno de cada uno para toda la sesion."""
+    global _hilos_iniciados
+    with _loop_lock:
+        if not _hilos_iniciados:
+            _hilos_iniciados = True
+            threading.Thread(target=_loop_despacho, daemon=True).start()
+            threading.Thread(target=_loop_escritura, daemon=True).start()
+
 def iniciar_loop():
     """Lanza el loop en un hilo daemon si no está corriendo."""
+    _iniciar_hilos()
     threading.Thread(target=loop_lectura, daemon=True).start()
\ No newline at end of file
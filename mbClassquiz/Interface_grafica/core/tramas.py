@@ -0,0 +1,250 @@
+# core/tramas.py
+# Tramas binarias del enlace USB con el concentrador:
+#   0x00 | COBS(contenido | CRC-16) | 0x00
+# El contenido empieza con su tipo. Los mensajes usan el mismo formato que las
+# tramas binarias de radio de microbitml (ver docs/framework/guia_microbitml.md).
+
+MSG    = 0x02   # mensaje
+EVENTO = 0x10   # evento del concentrador (button_a, usb_crc...)
+ERROR  = 0x11   # error del concentrador
+
+# Mismo orden que microbitml.CODIGOS: el indice es el codigo
+CODIGOS = ('REPORT', 'ID', 'ACK', 'QPARAMS', 'POLL', 'ANSWER', 'PING', 'PONG',
+           'CHECK_REG', 'REG_STATUS', 'CARRY', 'VALUE', 'STATS', 'STATV')
+
+_F_DGR    = 0x01
+_F_GR     = 0x02
+_F_NOMBRE = 0x04
+_V_INT    = 0x00
+_V_STR    = 0x01
+
+MAX_BUFFER = 65536   # bytes sin separador antes de descartar el buffer
+
+
+class TramaInvalida(ValueError):
+    """La trama llego cortada o con el CRC equivocado."""
+    pass
+
+
+def _tabla_crc():
+    tabla = []
+    for i in range(256):
+        c = i << 8
+        for _ in range(8):
+            c = (c << 1) ^ 0x1021 if c & 0x8000 else c << 1
+        tabla.append(c & 0xFFFF)
+    return tabla
+
+_CRC = _tabla_crc()
+
+def crc16(datos):
+    """CRC-16/CCITT (polinomio 0x1021, inicial 0xFFFF), igual que el concentrador."""
+    c = 0xFFFF
+    for b in datos:
+        c = ((c << 8) & 0xFFFF) ^ _CRC[(c >> 8) ^ b]
+    return c
+
+def cobs(datos):
+    sal = bytearray(1)
+    cod, n = 0, 1
+    for b in datos:
+        if b:
+            sal.append(b)
+            n += 1
+        if not b or n == 0xFF:
+            sal[cod] = n
+            cod = len(sal)
+            sal.append(0)
+            n = 1
+    sal[cod] = n
+    return bytes(sal)
+
+def descobs(datos):
+    sal = bytearray()
+    i = 0
+    while i < len(datos):
+        cod = datos[i]
+        if not cod or i + cod > len(datos):
+            raise TramaInvalida("COBS invalido")
+        sal += datos[i + 1:i + cod]
+        i += cod
+        if cod < 0xFF and i < len(datos):
+            sal.append(0)
+    return bytes(sal)
+
+def armar(contenido):
+    """Trama lista para escribir en el puerto."""
+    c = crc16(contenido)
+    return b'\x00' + cobs(bytes(contenido) + bytes((c >> 8, c & 0xFF))) + b'\x00'
+
+def abrir(datos):
+    """Contenido de una trama (sin los 0x00); TramaInvalida si no pasa el CRC."""
+    t = descobs(datos)
+    if len(t) < 3 or crc16(t[:-2]) != (t[-2] << 8) | t[-1]:
+        raise TramaInvalida("CRC invalido")
+    return t[:-2]
+
+
+def codificar(data):
+    """Trama de un mensaje para el concentrador, o None si no entra en el formato
+    binario (se manda como JSON)."""
+    name = data.get('name')
+    act  = data.get('act')
+    if not name or not act:
+        return None
+    try:
+        b = bytearray((MSG, 0))
+        a = act.encode('utf-8')
+        b.append(len(a))
+        b += a
+        flags = 0
+        if name in CODIGOS:
+            b.append(CODIGOS.index(name))
+        else:
+            flags |= _F_NOMBRE
+            n = name.encode('utf-8')
+            b.append(len(n))
+            b += n
+        dev, grp, rol = data.get('devID'), data.get('grp'), data.get('rol')
+        if dev and grp is not None and rol:
+            if len(dev) != 16:
+                return None
+            flags |= _F_DGR
+            b += bytes.fromhex(dev)
+        elif grp is not None and rol:
+            flags |= _F_GR
+        elif dev or grp is not None or rol:
+            return None
+        if flags & (_F_DGR | _F_GR):
+            b.append(int(grp))
+            n = str(rol).encode('utf-8')
+            b.append(len(n))
+            b += n
+        valores = data.get('valores') or []
+        b.append(len(valores))
+        for v in valores:
+            if isinstance(v, int) and not isinstance(v, bool) and -0x8000 <= v < 0x8000:
+                b += bytes((_V_INT, (v >> 8) & 0xFF, v & 0xFF))
+            else:
+                n = str(v).encode('utf-8')
+                b += bytes((_V_STR, len(n)))
+                b += n
+        b[1] = flags
+        return armar(b)
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+def decodificar(t):
+    """Dict igual al JSON del concentrador a partir del contenido de una trama."""
+    if t[0] == EVENTO:
+        return {'event': t[1:].decode('utf-8', errors='replace')}
+    if t[0] == ERROR:
+        return {'error': t[1:].decode('utf-8', errors='replace')}
+    if t[0] != MSG:
+        raise TramaInvalida(f"tipo desconocido {t[0]:#04x}")
+    try:
+        flags = t[1]
+        i = 3 + t[2]
+        msg = {'act': t[3:i].decode('utf-8')}
+        if flags & _F_NOMBRE:
+            msg['name'] = t[i + 1:i + 1 + t[i]].decode('utf-8')
+            i += 1 + t[i]
+        else:
+            msg['name'] = CODIGOS[t[i]]
+            i += 1
+        if flags & _F_DGR:
+            msg['devID'] = t[i:i + 8].hex()
+            i += 8
+        if flags & (_F_DGR | _F_GR):
+            msg['grp'] = t[i]
+            msg['rol'] = t[i + 2:i + 2 + t[i + 1]].decode('utf-8')
+            i += 2 + t[i + 1]
+        valores = []
+        for _ in range(t[i]):
+            if t[i + 1] == _V_INT:
+                v = (t[i + 2] << 8) | t[i + 3]
+                valores.append(str(v - 0x10000 if v & 0x8000 else v))
+                i += 3
+            else:
+                n = t[i + 2]
+                valores.append(t[i + 3:i + 3 + n].decode('utf-8'))
+                i += 2 + n
+        msg['valores'] = valores
+        return msg
+    except (IndexError, UnicodeDecodeError) as e:
+        raise TramaInvalida(f"mensaje cortado: {e}")
+
+
+class Separador:
+    """Acumula los bytes del puerto y separa lineas JSON y tramas binarias.
+
+    Acepta las dos cosas mezcladas: el concentrador contesta en texto al
+    negociar y vuelve a texto si se reinicia. El buffer se reusa: lo ya
+    separado se descarta de una vez al agregar bytes nuevos, no en cada mensaje.
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._ini = 0            # inicio de lo que falta separar en _buf
+
+    def agregar(self, datos):
+        if self._ini:
+            del self._buf[:self._ini]
+            self._ini = 0
+        self._buf += datos
+
+    def pendiente(self):
+        return len(self._buf) > self._ini
+
+    def siguiente(self):
+        """('txt', linea) o ('bin', datos sin los 0x00); None si falta completar."""
+        b = self._buf
+        i = self._ini
+        n = len(b)
+        try:
+            while i < n:
+                c = b[i]
+                if c == 0:
+                    fin = b.find(0, i + 1)
+                    if fin < 0:
+                        break
+                    if fin == i + 1:
+                        i += 1
+                        continue
+                    datos = bytes(b[i + 1:fin])
+                    i = fin + 1
+                    return ('bin', datos)
+                if c in b' \t\r\n':
+                    i += 1
+                    continue
+                if c not in b'{[':
+                    # Resto de una trama cortada: saltar hasta el proximo 0x00. Si antes
+                    # termina la linea es texto suelto (print o traceback del
+                    # concentrador): sale como 'txt' para que quede en el log
+                    cero, nl = b.find(0, i), b.find(b'\n', i)
+                    if cero < 0 and nl < 0:
+                        break
+                    if nl < 0 or 0 <= cero < nl:
+                        i = cero
+                        continue
+                fin = b.find(b'\n', i)
+                if fin < 0:
+                    break
+                linea = b[i:fin].decode('utf-8', errors='ignore').strip()
+                i = fin + 1
+                if linea:
+                    return ('txt', linea)
+            if n - i > MAX_BUFFER:
+                i = n
+            return None
+        finally:
+            self._ini = i
+
+    def todos(self):
+        """Todos los mensajes completos que hay en el buffer, en orden."""
+        items = []
+        while True:
+            item = self.siguiente()
+            if item is None:
+                return items
+            items.append(item)
@@ -1,8 +1,11 @@
 # classquiz.py
 from microbit import *
-from microbitml import Radio, ConfigManager
+from microbitml import Radio, ConfigManager, SlotScheduler
 
 ACTIVITY = "cqz"
+# Turnos por defecto si el REPORT no los anuncia (PC vieja): ~6 s para 9 grupos x 6 roles
+SLOT_MS_DEFAULT = 108
+CONFIABLE = False  # True: ANSWER con ACK y reintentos (requiere concentrador actualizado)
 
 class ClassQuiz:
     def __init__(self):
@@ -15,24 +18,24 @@ class ClassQuiz:
 
         self.radio = Radio(activity=ACTIVITY, channel=0)
         self.radio.configure(group=self.config.get('grupo'), role=self.config.get('role'))
+        self.radio.on('REG_STATUS', self.procesar_reg_status)
+        self.radio.on('REPORT',     self.procesar_report)
+        self.radio.on('ACK',        self.procesar_ack)
+        self.radio.on('QPARAMS',    self.procesar_qparams)
+        self.radio.on('POLL',       self.procesar_poll)
+        self.radio.on('PING',       self.procesar_ping)
 
         self.tipo_pregunta     = None
         self.num_opciones      = 4
         self.opcion_actual_idx = 0
         self.seleccionadas     = []
         self.registrado        = False
+        self.borrar_en         = 0     # running_time() en que se borra la flecha del ANSWER
 
-        self.mostrar_inicio()
+        # Turnos para responder REPORT: la PC anuncia ancho y cantidad
+        self.turnos = SlotScheduler(slot_ms=SLOT_MS_DEFAULT, slots=self.config.slots())
 
-    def calcular_delay_descubrimiento(self):
-        grupo = self.config.get('grupo') or 1
-        rol   = self.config.get('role') or 'A'
-        try:
-            indice_rol = self.config.roles.index(rol)
-        except:
-            indice_rol = 0
-        slot = (grupo - 1) * len(self.config.roles) + indice_rol
-        return int((slot * 5750) / 53) if slot < 54 else 0
+        self.mostrar_inicio()
 
     def log(self, mensaje):
         try:
@@ -52,11 +55,11 @@ class ClassQuiz:
         sleep(500)
         display.clear()
 
-    def procesar_report(self):
+    def procesar_report(self, mensaje):
         self.log("RX:REPORT")
-        delay = self.calcular_delay_descubrimiento()
+        # valores del REPORT: [ancho de turno ms, cantidad de turnos]
+        delay = self.turnos.wait(self.config.slot(), mensaje.valores)
         self.log("Delay:{}ms".format(delay))
-        sleep(delay)
         self.radio.send("ID", device_id=True)
         self.log("TX:ID")
 
@@ -97,19 +100,27 @@ class ClassQuiz:
         self.mostrar_estado_votacion()
 
     def procesar_poll(self, mensaje):
+        # El POLL va a un grupo y rol: del grupo solo contesta ese rol
+        if mensaje.rol and mensaje.rol != self.radio.role:
+            return
         self.log("POLL_MATCH")
         self.enviar_respuesta()
 
     def enviar_respuesta(self):
         letras     = ['A', 'B', 'C', 'D']
         respuestas = [letras[i] for i in range(len(self.seleccionadas)) if self.seleccionadas[i]]
-        self.radio.send("ANSWER", respuestas, device_id=True, packed=True)
+        # Con CONFIABLE se reintenta hasta que el concentrador confirme
+        self.radio.send("ANSWER", respuestas, device_id=True, packed=True, reliable=CONFIABLE)
         self.log("TX:ANSWER:{}".format(','.join(respuestas)))
+        # La flecha se borra desde el loop: dormir aca deja que la cola de radio
+        # se llene con los POLL y ANSWER del resto del aula
         display.show(Image.ARROW_W)
-        sleep(200)
-        display.clear()
+        self.borrar_en = running_time() + 200
 
     def procesar_ping(self, mensaje):
+        # El PING de la PC trae el devID destino: solo responde ese dispositivo
+        if mensaje.devID and mensaje.devID != self.radio.device_id:
+            return
         self.log("RX:PING")
         self.radio.send("PONG", device_id=True)
         self.log("TX:PONG")
@@ -139,38 +150,31 @@ class ClassQuiz:
             sleep(150)
             display.set_pixel(2, 2, 9)
 
-    def manejar_mensajes_radio(self):
-        mensaje = self.radio.receive()
-        if not mensaje.valid:
+    def procesar_reg_status(self, mensaje):
+        if self.registrado or not mensaje.valores:
+            return
+        # El REG_STATUS contesta el CHECK_REG de un dispositivo: el del resto no cuenta
+        if mensaje.devID and mensaje.devID != self.radio.device_id:
             return
+        estado = mensaje.valores[0]
+        self.log("REG_STATUS:{}".format(estado))
+        if estado == "OK":
+            self.registrado = True
+            self.log("Registro_recuperado")
+            display.show(Image.YES)
+            sleep(800)
+            display.clear()
+        elif estado == "NO":
+            self.log("No_registrado_esperar_REPORT")
+        elif estado == "CONFLICT":
+            self.log("CONFLICTO_grupo_rol")
+            display.show(Image.SAD)
+            sleep(1000)
+            display.clear()
 
-        if mensaje.name == 'REG_STATUS' and not self.registrado:
-            if mensaje.valores:
-                estado = mensaje.valores[0]
-                self.log("REG_STATUS:{}".format(estado))
-                if estado == "OK":
-                    self.registrado = True
-                    self.log("Registro_recuperado")
-                    display.show(Image.YES)
-                    sleep(800)
-                    display.clear()
-                elif estado == "NO":
-                    self.log("No_registrado_esperar_REPORT")
-                elif estado == "CONFLICT":
-                    self.log("CONFLICTO_grupo_rol")
-                    display.show(Image.SAD)
-                    sleep(1000)
-                    display.clear()
-        elif mensaje.name == 'REPORT':
-            self.procesar_report()
-        elif mensaje.name == 'ACK':
-            self.procesar_ack(mensaje)
-        elif mensaje.name == 'QPARAMS':
-            self.procesar_qparams(mensaje)
-        elif mensaje.name == 'POLL':
-            self.procesar_poll(mensaje)
-        elif mensaje.name == 'PING':
-            self.procesar_ping(mensaje)
+    def manejar_mensajes_radio(self):
+        # Vacia la cola y despacha cada mensaje a su handler (ver __init__)
+        self.radio.poll()
 
     def manejar_votacion(self):
         if self.registrado and self.tipo_pregunta is not None:
@@ -209,6 +213,9 @@ class ClassQuiz:
             if pin_logo.is_touched():
                 self.mostrar_config()
             self.manejar_mensajes_radio()
+            if self.borrar_en and running_time() >= self.borrar_en:
+                self.borrar_en = 0
+                display.clear()
             self.manejar_votacion()
             sleep(20)
 
@@ -1,109 +1,535 @@
 # concentrador.py
 from microbit import *
-from microbitml import Radio
+from microbitml import Radio, Message
+from array import array
 
 ACTIVITY = "con"
 CHANNEL  = 0
+BINARIO  = False   # True: hablar el formato binario compacto (requiere firmware actualizado en todos)
+AGRUPAR_MS = 0     # >0: juntar comandos chicos de la PC en una trama de radio (requiere firmware actualizado)
+FRAGMENTAR = False # True: partir en fragmentos los comandos largos de la PC en vez de recortarlos (requiere firmware actualizado)
+MAX_LINEAS = 16    # lineas de la PC procesadas por vuelta del loop
+HW_FILTRO  = False # True: escuchar solo la actividad de la PC, filtrada por hardware (estudiantes con hw_filter)
+LOTE_USB   = True  # True: varias tramas de radio en una sola linea USB (arreglo JSON); False: una linea por trama
+MAX_LOTE   = 16    # mensajes por linea USB como maximo
+USB_BINARIO = True # True: aceptar el pedido de la PC de pasar a tramas binarias (COBS + CRC)
+LARGO_USB  = 128   # largo tipico de una linea o trama de la PC
+ESPERA_MS  = 2     # pausa del loop solo cuando no hay nada pendiente en radio ni USB
+POLL_TIMEOUT_MS = 250   # POLL_ALL: espera por el ANSWER de cada estudiante
+POLL_REINTENTOS = 2     # POLL_ALL: POLL extra a quien no contesta
+ESPERA_ROSTER_MS = 1000 # POLL_ALL: sin el resto del roster, el barrido termina igual
+CONTEO = True      # True: llevar el conteo de respuestas de cada pregunta (la PC lo pide con TALLY)
+REGISTRO = True    # True: contestar CHECK_REG con el roster que carga la PC (REG_SET)
+
+# Tramas binarias por USB: 0x00 | COBS(contenido | CRC-16 2 bytes) | 0x00
+# El contenido empieza con su tipo; los mensajes usan el formato binario de radio
+_U_MSG    = 0x02   # mensaje: igual que una trama binaria de radio
+_U_EVENTO = 0x10   # evento: nombre en utf-8
+_U_ERROR  = 0x11   # error: texto en utf-8
+
+# CRC-16/CCITT (polinomio 0x1021, inicial 0xFFFF) por tabla: un paso por byte
+_CRC = array('H', [0] * 256)
+for _i in range(256):
+    _c = _i << 8
+    for _ in range(8):
+        _c = (_c << 1) ^ 0x1021 if _c & 0x8000 else _c << 1
+    _CRC[_i] = _c & 0xFFFF
+
+def crc16(datos):
+    c = 0xFFFF
+    for b in datos:
+        c = ((c << 8) & 0xFFFF) ^ _CRC[(c >> 8) ^ b]
+    return c
+
+# COBS: reemplaza los 0x00 para que 0x00 solo aparezca como separador de tramas
+def cobs(datos):
+    sal = bytearray(1)
+    cod = 0
+    n = 1
+    for b in datos:
+        if b:
+            sal.append(b)
+            n += 1
+        if not b or n == 0xFF:
+            sal[cod] = n
+            cod = len(sal)
+            sal.append(0)
+            n = 1
+    sal[cod] = n
+    return sal
+
+def descobs(datos):
+    sal = bytearray()
+    i = 0
+    while i < len(datos):
+        cod = datos[i]
+        if not cod or i + cod > len(datos):
+            raise ValueError('cobs')
+        sal.extend(datos[i + 1:i + cod])
+        i += cod
+        if cod < 0xFF and i < len(datos):
+            sal.append(0)
+    return sal
+
+# POLL_ALL: la PC pasa el roster ("grupo:rol") y el concentrador sondea a cada
+# uno, de a un POLL por vez, con timeout y reintentos propios. Los ANSWER van a
+# la PC como siempre; al final se informa quienes no contestaron.
+class Barrido:
+    def __init__(self):
+        self.activo = False
+        self.roster = []
+
+    def iniciar(self, act, total):
+        self.activo = True
+        self.act = act
+        self.total = total
+        self.pendientes = []
+        self.roster = []         # todas las entradas, en orden (para el mapa de TALLY)
+        self.sin = []
+        self.hechos = 0
+        self.actual = None
+        self.intentos = 0
+        self.t = running_time()
+        self.t_roster = self.t
+
+    def agregar(self, entradas):
+        for e in entradas:
+            if ':' in e:
+                self.pendientes.append(e)
+                self.roster.append(e)
+        self.t_roster = running_time()
+
+    # ANSWER recibido: si es del sondeado avanza; si llego tarde, ya no falta
+    def respuesta(self, msg):
+        clave = '{}:{}'.format(msg.grp, msg.rol)
+        if clave == self.actual:
+            self.hechos += 1
+            self.actual = None
+            return True
+        if clave in self.sin:
+            self.sin.remove(clave)
+        return False
+
+    def _poll(self, radio):
+        grp, rol = self.actual.split(':', 1)
+        radio.tune(self.act)
+        radio.send_fields(self.act, 'POLL', None, grp, rol, ())
+        radio.flush()
+        self.intentos += 1
+        self.t = running_time()
+
+    # Avanza el barrido; retorna True si envio algo
+    def tick(self, radio):
+        if self.actual is not None:
+            if running_time() - self.t < POLL_TIMEOUT_MS:
+                return False
+            if self.intentos <= POLL_REINTENTOS:
+                self._poll(radio)
+                return True
+            self.sin.append(self.actual)
+            self.hechos += 1
+            self.actual = None
+        if self.pendientes:
+            self.actual = self.pendientes.pop(0)
+            self.intentos = 0
+            self._poll(radio)
+            return True
+        return False
+
+    # Termino cuando se sondeo el roster completo (o dejo de llegar)
+    def terminado(self):
+        return self.actual is None and not self.pendientes and (
+            self.hechos >= self.total or running_time() - self.t_roster > ESPERA_ROSTER_MS)
+
+    def resumen(self):
+        self.activo = False
+        sin = '","'.join(self.sin)
+        return '{{"event":"poll_end","total":{},"sin_respuesta":[{}]}}'.format(
+            self.total, '"' + sin + '"' if sin else '')
+
+# Conteo de la pregunta actual: se reinicia con cada QPARAMS que pasa hacia la radio.
+# Cada estudiante ("grupo:rol") cuenta una vez: un ANSWER repetido (reintento o
+# nuevo POLL) reemplaza al anterior
+class Conteo:
+    def __init__(self):
+        self.respuestas = {}     # "grupo:rol" -> "A,C"
+        self.solo = False        # True: los ANSWER no van a la PC de a uno, solo en el resumen
+
+    def reiniciar(self):
+        self.respuestas = {}
+
+    def agregar(self, msg):
+        if msg.rol:
+            self.respuestas['{}:{}'.format(msg.grp, msg.rol)] = ','.join(msg.valores)
+
+    # {"event":"tally","n":..,"votos":{..},"mapa":"..","respuestas":{..}}
+    # mapa: un bit por entrada del roster del ultimo POLL_ALL (bit i = byte i // 8,
+    # bit i % 8), en hexadecimal
+    def resumen(self, roster):
+        votos = {}
+        for r in self.respuestas.values():
+            for letra in r.split(','):
+                if letra:
+                    votos[letra] = votos.get(letra, 0) + 1
+        mapa = bytearray((len(roster) + 7) // 8)
+        for i in range(len(roster)):
+            if roster[i] in self.respuestas:
+                mapa[i >> 3] |= 1 << (i & 7)
+        return '{{"event":"tally","n":{},"votos":{{{}}},"mapa":"{}","respuestas":{{{}}}}}'.format(
+            len(self.respuestas),
+            ','.join(['"{}":{}'.format(k, v) for k, v in votos.items()]),
+            ''.join(['{:02x}'.format(b) for b in mapa]),
+            ','.join(['"{}":"{}"'.format(k, v) for k, v in self.respuestas.items()]))
+
+# Roster de la PC para contestar CHECK_REG sin ida y vuelta por USB. Sin REG_SET
+# (PC vieja) queda inactivo y los CHECK_REG van a la PC como siempre
+class Registro:
+    def __init__(self):
+        self.activo = False
+        self.roster = {}         # "grupo:rol" -> devID
+        self.avisados = {}       # devID -> ultimo estado avisado a la PC
+
+    # REG_SET [indice, total, "g:r:devID"...]: indice 0 empieza de cero; sin
+    # valores se apaga y los CHECK_REG vuelven a la PC
+    def cargar(self, valores):
+        if not valores or valores[0] == '0':
+            self.roster = {}
+            self.avisados = {}
+        self.activo = len(valores) > 0
+        for e in valores[2:]:
+            clave, _, dev = e.rpartition(':')
+            if clave and clave not in self.roster:
+                self.roster[clave] = dev
+
+    # ACK de la PC a un ID del descubrimiento: ese grupo/rol queda registrado
+    # Un grupo/rol es del primero que lo registra, igual que en la PC
+    def ack(self, devid, grp, rol):
+        if not (self.activo and devid and rol):
+            return
+        clave = '{}:{}'.format(grp, rol)
+        if self.roster.get(clave, devid) != devid:
+            return
+        for otra in [k for k, v in self.roster.items() if v == devid]:
+            del self.roster[otra]
+        self.roster[clave] = devid
+
+    # Misma respuesta que _procesar_check_reg de la interfaz
+    def estado(self, msg):
+        dev = self.roster.get('{}:{}'.format(msg.grp, msg.rol))
+        if dev is None:
+            return 'NO'
+        return 'OK' if dev == msg.devID else 'CONFLICT'
+
+    # True si la PC todavia no sabe que ese dispositivo esta en ese estado
+    def cambio(self, devid, estado):
+        if self.avisados.get(devid) == estado:
+            return False
+        self.avisados[devid] = estado
+        return True
+
+# Serializa campos del Message a JSON minimo sin librerias
+def radio_a_json(msg):
+    valores_str = ""
+    if msg.valores:
+        valores_str = '","'.join(msg.valores)
+        valores_str = '["' + valores_str + '"]'
+    else:
+        valores_str = "[]"
+
+    act_str    = ',"act":"{}"'.format(msg.act) if msg.act else ""
+    devid_str  = ',"devID":"{}"'.format(msg.devID) if msg.devID else ""
+    grp_str    = ',"grp":{}'.format(msg.grp)       if msg.grp is not None else ""
+    rol_str    = ',"rol":"{}"'.format(msg.rol)     if msg.rol else ""
+
+    return '{{"name":"{}"{}{}{}{}, "valores":{}}}'.format(
+        msg.name, act_str, devid_str, grp_str, rol_str, valores_str
+    )
+
+# Lineas USB de un lote de mensajes JSON: uno solo sale como objeto, igual que
+# antes; varios, como arreglo
+def lineas_usb(items):
+    if len(items) == 1 or not LOTE_USB:
+        return items
+    return ['[' + ','.join(items) + ']'] if items else []
+
+# Claves del JSON de la PC: indice en Concentrador._campos
+_C_NAME, _C_ACT, _C_DEVID, _C_GRP, _C_ROL, _C_USB, _C_VALORES = range(7)
+_CLAVES = {'name': _C_NAME, 'act': _C_ACT, 'devID': _C_DEVID, 'grp': _C_GRP,
+           'rol': _C_ROL, 'usb': _C_USB, 'valores': _C_VALORES}
 
 class Concentrador:
     def __init__(self):
-        self.radio = Radio(activity=ACTIVITY, channel=CHANNEL)
+        self.radio = Radio(activity=ACTIVITY, channel=CHANNEL, binary=BINARIO, coalesce=AGRUPAR_MS,
+                           hw_filter=HW_FILTRO, fragment=FRAGMENTAR)
         uart.init(baudrate=115200)
+        self.usb_bin = False     # la PC pidio tramas binarias
+        self._entrada = b''      # bytes de la PC sin procesar (modo binario)
+        self._logo = False       # el logo estaba tocado en la vuelta anterior
+        self._campos = [None] * 7    # campos de la ultima linea JSON (campos_json)
+        self._valores = []
+        self.barrido = Barrido()
+        self.conteo = Conteo()
+        self.registro = Registro()
 
     def enviar_usb(self, msg):
         print(msg)
 
-    def radio_a_json(self, msg):
-        # Serializa campos del Message a JSON minimo sin librerias
-        valores_str = ""
-        if msg.valores:
-            valores_str = '","'.join(msg.valores)
-            valores_str = '["' + valores_str + '"]'
+    def trama_usb(self, contenido):
+        c = crc16(contenido)
+        contenido.append(c >> 8)
+        contenido.append(c & 0xFF)
+        return b'\x00' + cobs(contenido) + b'\x00'
+
+    def enviar_evento(self, nombre):
+        if self.usb_bin:
+            t = bytearray(1)
+            t[0] = _U_EVENTO
+            t.extend(bytes(nombre, 'utf-8'))
+            uart.write(self.trama_usb(t))
         else:
-            valores_str = "[]"
+            self.enviar_usb('{{"event":"{}"}}'.format(nombre))
 
-        act_str    = ',"act":"{}"'.format(msg.act) if msg.act else ""
-        devid_str  = ',"devID":"{}"'.format(msg.devID) if msg.devID else ""
-        grp_str    = ',"grp":{}'.format(msg.grp)       if msg.grp is not None else ""
-        rol_str    = ',"rol":"{}"'.format(msg.rol)     if msg.rol else ""
+    def radio_a_bin(self, msg):
+        # Trama USB del mensaje; None si algun campo no entra en el formato binario
+        # Mismos campos que radio_a_json: grupo y rol van juntos, devID solo con ellos
+        if not msg.act or (msg.grp is None) != (not msg.rol) or (msg.devID and not msg.rol):
+            return None
+        t = self.radio._codificar(msg.act, msg.name, msg.devID, msg.grp,
+                                  msg.rol, msg.valores)
+        return self.trama_usb(t) if t else None
 
-        return '{{"name":"{}"{}{}{}{}, "valores":{}}}'.format(
-            msg.name, act_str, devid_str, grp_str, rol_str, valores_str
-        )
+    # Parseo manual del JSON que manda la PC en una sola pasada: cada clave
+    # conocida deja su valor en self._campos (por indice _C_*), el resto se
+    # saltea. valores queda en self._valores, que se reusa entre lineas
+    def campos_json(self, linea):
+        c = self._campos
+        c[0] = c[1] = c[2] = c[3] = c[4] = c[5] = c[6] = None
+        v = self._valores
+        v.clear()
+        n = len(linea)
+        i = 0
+        while True:
+            i = linea.find('"', i)
+            if i < 0:
+                break
+            j = linea.find('"', i + 1)
+            if j < 0:
+                break
+            k = _CLAVES.get(linea[i + 1:j])
+            # ':' y un espacio opcional (json.dumps sin separators)
+            i = j + 2
+            if i < n and linea[i] == ' ':
+                i += 1
+            if i >= n:
+                break
+            ch = linea[i]
+            if ch == '"':
+                j = linea.find('"', i + 1)
+                if j < 0:
+                    break
+                if k is not None:
+                    c[k] = linea[i + 1:j]
+                i = j + 1
+            elif ch == '[':
+                fin = linea.find(']', i)
+                if fin < 0:
+                    break
+                i += 1
+                while i < fin:
+                    ch = linea[i]
+                    if ch == '"':
+                        j = linea.find('"', i + 1)
+                        if k == _C_VALORES:
+                            v.append(linea[i + 1:j])
+                        i = j + 1
+                    elif ch == ',' or ch == ' ':
+                        i += 1
+                    else:
+                        j = linea.find(',', i, fin)
+                        if j < 0:
+                            j = fin
+                        if k == _C_VALORES:
+                            v.append(linea[i:j].strip())
+                        i = j
+                i = fin + 1
+            else:
+                j = linea.find(',', i)
+                fin = linea.find('}', i)
+                if j < 0 or 0 <= fin < j:
+                    j = fin if fin >= 0 else n
+                if k is not None:
+                    dato = linea[i:j].strip()
+                    c[k] = None if dato == 'null' else dato
+                i = j
+        return c
 
     def json_a_radio(self, linea):
-        # Parseo manual del JSON que manda la PC
-        # Extrae campos y construye el payload radio
-        def extraer(campo, texto):
-            marca = '"{}":'.format(campo)
-            idx = texto.find(marca)
-            if idx == -1:
-                return None
-            inicio = idx + len(marca)
-            if texto[inicio] == '"':
-                fin = texto.index('"', inicio + 1)
-                return texto[inicio + 1:fin]
-            elif texto[inicio] == '[':
-                fin = texto.index(']', inicio)
-                return texto[inicio:fin + 1]
-            else:
-                fin = inicio
-                while fin < len(texto) and texto[fin] not in (',', '}'):
-                    fin += 1
-                return texto[inicio:fin].strip()
-
-        name   = extraer("name",   linea)
-        act    = extraer("act",    linea)
-        devid  = extraer("devID",  linea)
-        grp    = extraer("grp",    linea)
-        rol    = extraer("rol",    linea)
-        valores_raw = extraer("valores", linea)
-
-        if not name:
+        c = self.campos_json(linea)
+        if not c[_C_NAME]:
+            self.control_usb(c[_C_USB])
             return
+        # Usa la actividad que envio la PC, si no viene usa la propia.
+        # Radio elige sufijo (_DGR/_GR) y formato (texto o binario) segun los campos
+        self.reenviar(c[_C_ACT] or ACTIVITY, c[_C_NAME], c[_C_DEVID], c[_C_GRP], c[_C_ROL],
+                      self._valores)
 
-        # Armar valores como string separado por coma
-        valores_str = ""
-        if valores_raw and valores_raw != "[]":
-            # quitar corchetes y comillas
-            inner = valores_raw.strip("[]").replace('"', '')
-            valores_str = inner  # ya viene separado por coma
-
-        # Sanitizar: quitar comillas residuales si el parser falla
-        name  = name.strip('"')  if name  else name
-        act   = act.strip('"')   if act   else act
-        devid = devid.strip('"') if devid else devid
-        rol   = rol.strip('"')   if rol   else rol
-
-        # Determinar sufijo y args segun campos presentes
-        if devid and grp is not None and rol:
-            sufijo = "_DGR"
-            base = "{}:{}:{}:{}".format(name + sufijo, devid, grp, rol)
-        elif grp is not None and rol:
-            sufijo = "_GR"
-            base = "{}:{}:{}".format(name + sufijo, grp, rol)
-        else:
-            base = name
+    # Comando de la PC ya decodificado (JSON o trama binaria): los propios del
+    # concentrador se atienden aca, el resto sale por radio
+    def reenviar(self, act, name, devid, grp, rol, valores):
+        if name == 'POLL_ALL':
+            self.poll_all(act, valores)
+            return
+        if name == 'TALLY':
+            self.tally(valores)
+            return
+        if name == 'REG_SET':
+            if REGISTRO:
+                self.registro.cargar(valores)
+            return
+        if name == 'QPARAMS':
+            self.conteo.reiniciar()
+        elif name == 'ACK':
+            self.registro.ack(devid, grp, rol)
+        # Con HW_FILTRO la radio pasa a la direccion de la actividad de la PC
+        self.radio.tune(act)
+        self.radio.send_fields(act, name, devid, grp, rol, valores)
 
-        # Usa la actividad que envio la PC, si no viene usa la propia
-        prefijo = act if act else ACTIVITY
-        payload = prefijo + ":" + base
-        if valores_str:
-            payload += ":" + valores_str
+    def tally(self, valores):
+        # TALLY: resumen del conteo; ["solo"] / ["todo"] dejan de reenviar o
+        # vuelven a reenviar los ANSWER de a uno
+        if not CONTEO:
+            return
+        if valores and valores[0] in ('solo', 'todo'):
+            self.conteo.solo = valores[0] == 'solo'
+            return
+        self.enviar_usb(self.conteo.resumen(self.barrido.roster))
 
-        self.radio.send(payload, CMD=False)
+    # CHECK_REG con el roster cargado: REG_STATUS directo por radio. Retorna el
+    # evento para la PC si el estado de ese dispositivo cambio, o None
+    def check_reg(self, msg):
+        estado = self.registro.estado(msg)
+        self.radio.tune(msg.act)
+        self.radio.send_fields(msg.act, 'REG_STATUS', msg.devID, msg.grp, msg.rol, (estado,))
+        if not self.registro.cambio(msg.devID, estado):
+            return None
+        return '{{"event":"check_reg","devID":"{}","grp":{},"rol":"{}","estado":"{}"}}'.format(
+            msg.devID, msg.grp, msg.rol, estado)
 
-    def manejar_radio(self):
-        msg = self.radio.receive(full=True)
-        if not msg.valid or not msg.name:
+    def poll_all(self, act, valores):
+        # valores: [indice del primer estudiante, total, "grupo:rol", ...]
+        # El roster llega en varias lineas; la de indice 0 empieza un barrido nuevo
+        if len(valores) < 2:
             return
+        if valores[0] == '0':
+            self.barrido.iniciar(act, int(valores[1]))
+            self.enviar_usb('{{"event":"poll_start","total":{}}}'.format(valores[1]))
+        if self.barrido.activo:
+            self.barrido.agregar(valores[2:])
+
+    def manejar_barrido(self):
+        b = self.barrido
+        if not b.activo:
+            return False
+        if b.tick(self.radio):
+            return True
+        if b.terminado():
+            self.enviar_usb(b.resumen())
+        return False
+
+    def control_usb(self, modo):
+        # {"usb":"bin"} / {"usb":"txt"}: la PC elige el formato; la respuesta va
+        # siempre en texto y el cambio rige desde la trama siguiente
+        if modo is None:
+            return
+        self.usb_bin = USB_BINARIO and modo == 'bin'
+        self.enviar_usb('{{"event":"usb","modo":"{}"}}'.format('bin' if self.usb_bin else 'txt'))
+
+    def bin_a_radio(self, datos):
+        # Trama binaria de la PC: se descarta entera si el CRC no coincide
         try:
-            self.enviar_usb(self.radio_a_json(msg))
-        except Exception as e:
-            self.enviar_usb('{{"error":"{}"}}'.format(str(e)))
+            t = descobs(datos)
+        except ValueError:
+            return
+        if len(t) < 3 or crc16(memoryview(t)[:-2]) != (t[-2] << 8) | t[-1]:
+            self.enviar_evento('usb_crc')
+            return
+        if t[0] != _U_MSG:
+            return
+        msg = Message()
+        self.radio._procesar_bin(bytes(t[:-2]), msg, None, True)
+        if msg.valid:
+            self.reenviar(msg.act, msg.name, msg.devID, msg.grp, msg.rol, msg.valores)
+
+    def enviar_lote(self, items):
+        for linea in lineas_usb(items):
+            self.enviar_usb(linea)
+
+    def manejar_radio(self):
+        # Vacia la cola de radio y reenvia todo en lineas de hasta MAX_LOTE mensajes
+        # Retorna True si hubo algo que reenviar
+        items = []
+        tramas = []
+        hubo = False
+        local = False
+        # Tope de vueltas: con la radio saturada tambien hay que atender la PC,
+        # y si la PC mando algo se la atiende antes de seguir vaciando
+        for vuelta in range(4):
+            if vuelta and uart.any():
+                break
+            lote = self.radio.receive_all(full=True)
+            if not lote:
+                break
+            hubo = True
+            for msg in lote:
+                if len(items) == MAX_LOTE:
+                    self.enviar_lote(items)
+                    items = []
+                if not msg.name:
+                    continue
+                if msg.name == 'CHECK_REG' and self.registro.activo:
+                    local = True
+                    evento = self.check_reg(msg)
+                    if evento:
+                        items.append(evento)
+                    continue
+                if msg.name == 'ANSWER':
+                    if self.barrido.activo:
+                        self.barrido.respuesta(msg)
+                    if CONTEO:
+                        self.conteo.agregar(msg)
+                        if self.conteo.solo:
+                            continue
+                try:
+                    if self.usb_bin:
+                        t = self.radio_a_bin(msg)
+                        if t:
+                            tramas.append(t)
+                            continue
+                    items.append(radio_a_json(msg))
+                except Exception as e:
+                    items.append('{{"error":"{}"}}'.format(str(e)))
+        # Con AGRUPAR_MS los REG_STATUS de una tanda de CHECK_REG salen juntos
+        if local:
+            self.radio.flush()
+        # En modo binario cada mensaje es su trama; salen todas en una escritura
+        if tramas:
+            uart.write(b''.join(tramas))
+        self.enviar_lote(items)
+        return hubo
 
     def manejar_usb(self):
-        if uart.any():
+        # Procesa todas las lineas pendientes: con AGRUPAR_MS > 0 una rafaga de
+        # PING/ACK de la PC sale en pocas tramas en lugar de una por comando
+        # Retorna True si proceso alguna linea o trama
+        if self.usb_bin or self._entrada:
+            hubo = self.manejar_usb_bin()
+            self.radio.flush()
+            return hubo
+        hubo = False
+        for _ in range(MAX_LINEAS):
+            if not uart.any():
+                break
+            hubo = True
             try:
                 linea = uart.readline()
                 if linea:
@@ -112,14 +538,50 @@ class Concentrador:
                         self.json_a_radio(linea)
             except:
                 pass
+        self.radio.flush()
+        return hubo
+
+    def manejar_usb_bin(self):
+        # Separa tramas binarias (entre 0x00) y lineas JSON: la PC puede seguir
+        # mandando texto hasta recibir la confirmacion del cambio
+        datos = uart.read()
+        if datos:
+            self._entrada += datos
+        hubo = False
+        for _ in range(MAX_LINEAS):
+            e = self._entrada
+            if not e:
+                break
+            binaria = e[0] == 0
+            fin = e.find(b'\x00', 1) if binaria else e.find(b'\n')
+            if fin < 0:
+                # Basura sin separador: no dejar crecer el buffer
+                if len(e) > 4 * LARGO_USB:
+                    self._entrada = b''
+                break
+            self._entrada = e[fin:] if binaria and fin == 1 else e[fin + 1:]
+            hubo = True
+            try:
+                if binaria and fin > 1:
+                    self.bin_a_radio(e[1:fin])
+                elif not binaria:
+                    linea = e[:fin].decode('utf-8').strip()
+                    if linea:
+                        self.json_a_radio(linea)
+            except:
+                pass
+        return hubo
 
     def manejar_botones(self):
         if button_a.was_pressed():
-            self.enviar_usb('{"event":"button_a"}')
+            self.enviar_evento('button_a')
         if button_b.was_pressed():
-            self.enviar_usb('{"event":"button_b"}')
-        if pin_logo.is_touched():
-            self.enviar_usb('{"event":"logo_touch"}')
+            self.enviar_evento('button_b')
+        # Un evento por toque, no uno por vuelta mientras siga tocado
+        tocado = pin_logo.is_touched()
+        if tocado and not self._logo:
+            self.enviar_evento('logo_touch')
+        self._logo = tocado
 
     def run(self):
         self.enviar_usb('{"event":"gateway_ready"}')
@@ -127,10 +589,16 @@ class Concentrador:
         sleep(1000)
         display.clear()
 
+        # Sin pausa fija: se sigue mientras haya trabajo y se duerme solo sin nada
+        # pendiente. La PC va primero para que POLL/ACK salgan apenas llegan
         while True:
             self.manejar_botones()
-            self.manejar_radio()
-            self.manejar_usb()
-            sleep(50)
+            ocupado = self.manejar_usb()
+            if self.manejar_radio():
+                ocupado = True
+            if self.manejar_barrido():
+                ocupado = True
+            if not ocupado:
+                sleep(ESPERA_MS)
 
 Concentrador().run()
\ No newline at end of file
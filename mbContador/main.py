@@ -34,6 +34,7 @@ import microbit as mb
 import microbitml as mbml
 
 ACTIVITY = "cnt"
+HW_FILTRO = False  # True: filter activity and group in the radio hardware (flash every board of the activity)
 base = 5
 numberLength = 3  # lenght of the distributed counter
 roles = ('A', 'B', 'C', 'D', 'E', 'F', 'G',
@@ -63,9 +64,11 @@ class MbContador:
         self.role = self.config.get('role')
         self.role_next = self.get_next_role()
 
-        # Setup radio communication
-        self.radio = mbml.Radio(activity=ACTIVITY, channel=0)
-        self.radio.configure(group=self.grupo, role=self.role)
+        # Setup radio communication. CARRY only travels inside the group, so with
+        # HW_FILTRO both activity and group are filtered by the radio hardware
+        self.radio = mbml.Radio(activity=ACTIVITY, channel=0, hw_filter=HW_FILTRO)
+        self.radio.configure(group=self.grupo, role=self.role, hw_group=HW_FILTRO)
+        self.radio.on('CARRY', self.handle_carry)
 
         # Counter state
         self.base = base
@@ -101,8 +104,10 @@ class MbContador:
     def send_carry(self):
         """Send carry message to the next digit in sequence"""
         if self.role_next:  # ... is not None
-            self.radio.send("CARRY", self.role_next)
-            print("TX:CARRY to role {}".format(self.role_next))
+            # Reliable: a lost CARRY would corrupt the distributed count
+            self.radio.send("CARRY", self.role_next, reliable=True, to=self.role_next)
+            print("TX:CARRY to role {} (retransmissions so far: {})".format(
+                self.role_next, self.radio.retransmisiones))
 
     def get_next_role(self):
         """Get the next role in the sequence (A->B->C->D->...)"""
@@ -123,18 +128,17 @@ class MbContador:
         mb.display.show(str(self.count))
 
     def handle_radio_messages(self):
-        """Handle incoming radio messages"""
-        message = self.radio.receive()
-        if not message.valid:
-            return
-
-        if message.name == 'CARRY':
-            # Check if this carry is meant for our role
-            if message.valores and len(message.valores) > 0:
-                target_role = message.valores[0]
-                if target_role == self.config.get('role'):
-                    print("RX:CARRY for role {}".format(target_role))
-                    self.increment_count()
+        """Drain the radio queue, dispatching each message to its handler"""
+        self.radio.poll()
+
+    def handle_carry(self, message):
+        """Handle a CARRY message"""
+        # Check if this carry is meant for our role
+        if message.valores and len(message.valores) > 0:
+            target_role = message.valores[0]
+            if target_role == self.config.get('role'):
+                print("RX:CARRY for role {}".format(target_role))
+                self.increment_count()
 
     def handle_buttons(self):
         """Handle button presses - only units digit (role A) responds to buttons"""
@@ -157,7 +161,7 @@ class MbContador:
             # Configuration changed, update radio
             nuevo_grupo = self.config.get('grupo')
             nuevo_role = self.config.get('role')
-            self.radio.configure(group=nuevo_grupo, role=nuevo_role)
+            self.radio.configure(group=nuevo_grupo, role=nuevo_role, hw_group=HW_FILTRO)
             self.role = nuevo_role
             print("Config updated: Group={}, Role={}".format(nuevo_grupo, nuevo_role))
 
@@ -7,11 +7,14 @@ ACTIVITY = "pct"
 PASO_A = 1   # peso del rol A
 PASO_B = 2   # peso del rol B
 SUMA_MAX = 22
+HW_FILTRO = False  # True: actividad y grupo filtrados por hardware (cargar el firmware nuevo en todos)
 
 class PerceptronApp:
     def __init__(self):
         # Roles: Z es el axon (suma), A y B son las entradas (dendritas)
-        self.config = ConfigManager(roles=['Z','A','B'], grupos_max=9, grupos_min=1, extra_fields={'valor':0})
+        # El valor cambia con cada boton: se escribe en flash recien 2 s despues del ultimo cambio
+        self.config = ConfigManager(roles=['Z','A','B'], grupos_max=9, grupos_min=1, extra_fields={'valor':0},
+                                    debounce_ms=2000)
         
         cargado = self.config.load()
         print("Config_cargada:{}".format(cargado))
@@ -25,9 +28,11 @@ class PerceptronApp:
         grupo = self.config.get('grupo')
         rol   = self.config.get('role')
         
-        # El canal de radio coincide con el numero de grupo
-        self.radio = Radio(activity=ACTIVITY, channel=grupo)
-        self.radio.configure(group=grupo, role=rol)
+        # El canal de radio coincide con el numero de grupo; con HW_FILTRO actividad
+        # y grupo se filtran por hardware (VALUE no sale del grupo)
+        self.radio = Radio(activity=ACTIVITY, channel=grupo, hw_filter=HW_FILTRO)
+        self.radio.configure(group=grupo, role=rol, hw_group=HW_FILTRO)
+        self.radio.on('VALUE', self.procesar_valor)
         
         # El rol Z lleva la cuenta de ambas entradas
         self.suma_total = 0
@@ -57,7 +62,7 @@ class PerceptronApp:
             valor = 0
         valor = (valor + delta) % 10
         self.config.set('valor', valor)
-        self.config.save()
+        self.config.save()  # agenda la escritura, la hace tick()
         valor_ponderado = valor * peso
         self.mostrar_leds(valor_ponderado)
         
@@ -79,39 +84,41 @@ class PerceptronApp:
             self.actualizar_valor(1, PASO_B)
 
     def rol_z(self):
-        # Z escucha los valores de A y B y calcula la suma
-        mensaje = self.radio.receive('VALUE')
-        if mensaje.valid:
-            print("RX:Z:emisor={},valores={}".format(mensaje.rol, mensaje.valores))
-            try:
-                valor_recibido = int(mensaje.valores[0])
-                suma_anterior = self.suma_total
-
-                # Actualizar el valor del rol que envio
-                if mensaje.rol == 'A':
-                    self.valor_a = valor_recibido
-                elif mensaje.rol == 'B':
-                    self.valor_b = valor_recibido
-
-                self.suma_total = self.valor_a + self.valor_b
-                if self.suma_total > SUMA_MAX:
-                    self.suma_total = SUMA_MAX
-
-                print("SUMA:A={},B={},total={}".format(self.valor_a, self.valor_b, self.suma_total))
-
-                # Sonido al alcanzar el maximo (activacion del perceptron)
-                if self.suma_total == SUMA_MAX and suma_anterior != SUMA_MAX:
-                    music.pitch(frequency=500, duration=250, wait=False)
-
-                self.mostrar_leds(self.suma_total)
-            except Exception as error:
-                print("ERR:Z:{}".format(error))
+        # Z escucha los valores de A y B (ver procesar_valor)
+        self.radio.poll()
+
+    def procesar_valor(self, mensaje):
+        # Calcula la suma con el valor recibido de A o B
+        print("RX:Z:emisor={},valores={}".format(mensaje.rol, mensaje.valores))
+        try:
+            valor_recibido = int(mensaje.valores[0])
+            suma_anterior = self.suma_total
+
+            # Actualizar el valor del rol que envio
+            if mensaje.rol == 'A':
+                self.valor_a = valor_recibido
+            elif mensaje.rol == 'B':
+                self.valor_b = valor_recibido
+
+            self.suma_total = self.valor_a + self.valor_b
+            if self.suma_total > SUMA_MAX:
+                self.suma_total = SUMA_MAX
+
+            print("SUMA:A={},B={},total={}".format(self.valor_a, self.valor_b, self.suma_total))
+
+            # Sonido al alcanzar el maximo (activacion del perceptron)
+            if self.suma_total == SUMA_MAX and suma_anterior != SUMA_MAX:
+                music.pitch(frequency=500, duration=250, wait=False)
+
+            self.mostrar_leds(self.suma_total)
+        except Exception as error:
+            print("ERR:Z:{}".format(error))
 
     def cambiar_config(self):
         # Mantener pin1 tocado + botones para cambiar rol y grupo
         if self.config.config_rg(pin1, button_a, button_b, self.mostrar_config):
             nuevo_grupo = self.config.get('grupo')
-            self.radio.configure(group=nuevo_grupo, role=self.config.get('role'), channel=nuevo_grupo)
+            self.radio.configure(group=nuevo_grupo, role=self.config.get('role'), channel=nuevo_grupo, hw_group=HW_FILTRO)
 
     def mostrar_config(self):
         rol   = self.config.get('role')
@@ -125,6 +132,7 @@ class PerceptronApp:
         display.clear()
 
     def step(self):
+        self.config.tick()
         self.cambiar_config()
         # Logo muestra la actividad actual
         if pin_logo.is_touched():
@@ -1,24 +1,98 @@
 #
-# microbit-module: microbitml@1.0.0
+# microbit-module: microbitml@2.0.0
 #
 # ---
 # microbitml.py
 # Libreria de comunicacion radio para micro:bit
 
-from microbit import display, sleep
+from microbit import display, sleep, running_time
 import radio
 import machine
+import random
+
+# Tamaño de la cola de radio (tramas que el hardware guarda entre lecturas)
+QUEUE = 10
+# Largo maximo de una trama en el aire (bytes, cabecera incluida)
+LARGO = 64
+
+# Direccion de radio por defecto de micro:bit. La escuchan los Radio sin hw_filter
+# y el firmware viejo: es la direccion de broadcast entre actividades
+DIR_BROADCAST = 0x75626974
+
+# Cabecera que MicroPython antepone a radio.send(str): trama de texto
+_TXT = b'\x01\x00\x01'
+# Primer byte de una trama binaria compacta
+_BIN = 0x02
+
+# Primer byte de un fragmento: 0x03 | origen (2) | id msg | indice | total | datos
+_FRG = 0x03
+_FRG_CAB = 6
+
+# Limites del rearmado de mensajes fragmentados
+MAX_FRAGMENTOS = 8          # fragmentos por mensaje (8 * 58 = 464 bytes)
+MAX_REARMADOS = 2           # mensajes a medio rearmar al mismo tiempo
+TIMEOUT_REARMADO = 1000     # ms sin completarse antes de descartarlo
+
+# Entrega confiable: 0x04 | origen (2) | seq | len destino | destino | trama
+# ACK:               0x05 | origen (2) | seq | len destino | destino
+_REL = 0x04
+_ACK = 0x05
+
+# Lote: 0x06 | (largo | trama) * n  -- varios mensajes chicos en una trama
+_LOTE = 0x06
+
+MAX_PENDIENTES = 4          # mensajes confiables esperando ACK
+MAX_REINTENTOS = 4          # retransmisiones antes de darlo por perdido
+RTO = 60                    # ms de espera antes del primer reintento (se duplica)
+DEDUPE = 16                 # mensajes confiables recordados para descartar repetidos
+# Tiempo en que un emisor puede seguir reintentando un mensaje (suma de las esperas
+# de tick): un repetido mas viejo que esto es otro mensaje con el mismo seq
+VISTO_MS = RTO * (2 << MAX_REINTENTOS) + RTO * (MAX_REINTENTOS + 1)
+
+# Flags del formato binario
+_F_DGR = 0x01      # lleva devID, grupo y rol
+_F_GR = 0x02       # lleva grupo y rol
+_F_NOMBRE = 0x04   # nombre literal (no esta en CODIGOS)
+
+# Tipos de valor del formato binario
+_V_INT = 0x00      # entero con signo de 16 bits
+_V_STR = 0x01      # texto con largo de 1 byte
+
+# Codigos de mensaje del formato binario: el indice es el codigo.
+# Agregar nombres solo al final para no romper firmware ya flasheado.
+CODIGOS = ('REPORT', 'ID', 'ACK', 'QPARAMS', 'POLL', 'ANSWER', 'PING', 'PONG',
+           'CHECK_REG', 'REG_STATUS', 'CARRY', 'VALUE', 'STATS', 'STATV')
+
+# Orden de los contadores de Radio.stats()
+STATS_CAMPOS = ('tx', 'rx', 'otra_act', 'otro_grupo', 'filtrados', 'malformados',
+                'cola_llena', 'retransmisiones', 'fallidos', 'duplicados')
+# Contadores de la respuesta STATV a un STATS: descartados suma otra_act, otro_grupo,
+# filtrados y malformados. Van sin devID y topeados en STATV_TOPE para entrar en una trama
+STATV_CAMPOS = ('tx', 'rx', 'descartados', 'cola_llena', 'retransmisiones', 'fallidos', 'duplicados')
+STATV_TOPE = 9999
+
+# Como decodificar valores en Message (se hace recien cuando se piden)
+_M_TXT = 0         # un campo de texto separado por comas
+_M_LIBRE = 1       # resto de la trama sin sufijo: separan ':' y ','
+_M_BIN = 2         # valores tipados de una trama binaria
+
+
+# Direccion de radio de una actividad (FNV-1a de 32 bits del nombre)
+def direccion(act):
+    h = 0x811C9DC5
+    for b in bytes(act[:5], 'utf-8'):
+        h = ((h ^ b) * 0x01000193) & 0xFFFFFFFF
+    return h if h != DIR_BROADCAST else h ^ 1
+
 
 # Objeto retornado por receive()
+# __slots__: en CPython cada Message ocupa menos; MicroPython lo ignora
 class Message:
+    __slots__ = ('valid', 'act', 'name', 'devID', 'grp', 'rol',
+                 '_raw', '_vi', '_vf', '_modo', '_valores')
+
     def __init__(self):
-        self.valid = False
-        self.act = None
-        self.name = None
-        self.devID = None
-        self.grp = None
-        self.rol = None
-        self.valores = []
+        self._reset()
 
     def _reset(self):
         self.valid = False
@@ -27,99 +101,642 @@ class Message:
         self.devID = None
         self.grp = None
         self.rol = None
-        self.valores = []
+        # Trama cruda y posicion de los valores, sin decodificar
+        self._raw = None
+        self._vi = 0
+        self._vf = 0
+        self._modo = _M_TXT
+        self._valores = None
+
+    # Lista de strings con los datos; se arma al primer acceso
+    @property
+    def valores(self):
+        if self._valores is None:
+            self._valores = []
+            if self._raw is not None:
+                try:
+                    self._valores = self._decodificar()
+                except:
+                    pass  # trama cortada: sin valores
+        return self._valores
+
+    @valores.setter
+    def valores(self, v):
+        self._valores = v
+
+    def _decodificar(self):
+        raw = self._raw
+        i = self._vi
+        if self._modo == _M_BIN:
+            valores = []
+            for _ in range(raw[i]):
+                if raw[i + 1] == _V_INT:
+                    v = (raw[i + 2] << 8) | raw[i + 3]
+                    valores.append(str(v - 0x10000 if v & 0x8000 else v))
+                    i += 3
+                else:
+                    n = raw[i + 2]
+                    valores.append(str(raw[i + 3:i + 3 + n], 'utf-8'))
+                    i += 2 + n
+            return valores
+        vr = str(raw[i:self._vf], 'utf-8')
+        if self._modo == _M_LIBRE:
+            vr = vr.replace(':', ',')
+        return vr.split(',') if ',' in vr else [vr]
 
 
 # Manejo de comunicacion radio
 class Radio:
-    def __init__(self, activity='mbtml', channel=0):
+    # binary=True: envia en formato binario compacto (recibe ambos formatos siempre)
+    # coalesce=ms: junta los mensajes chicos enviados dentro de esa ventana en una trama
+    # fragment=True: parte en fragmentos los mensajes que no entran en LARGO; sin esto se
+    # recortan, como antes (los fragmentos se rearman al recibir siempre)
+    # hw_filter=True: la radio usa la direccion de la actividad y el hardware descarta
+    # las tramas de otras actividades antes de que lleguen a Python
+    # ring=n: Messages que reciclan receive/receive_all/receive_iter; los ultimos n-1
+    # mensajes validos siguen intactos (se pueden guardar para procesarlos despues)
+    def __init__(self, activity='mbtml', channel=0, binary=False, coalesce=0, hw_filter=False,
+                 ring=QUEUE + 1, fragment=False):
         self.activity = activity[:5]
         self.device_id = ''.join(['{:02x}'.format(b) for b in machine.unique_id()])
+        self.binary = binary
         self.group = 0
         self.role = 'A'
+        # Prefijos precalculados para descartar tramas sin decodificarlas
+        self._act_b = bytes(self.activity, 'utf-8')
+        self._pref = bytes(self.activity + ':', 'utf-8')
+        self._grp_b = b'0'
+        self._grp_n = 0
+        self._bypass = True
         self.channel = channel
         self.radio = radio
-        self._resultado = Message()
+        # Anillo de Messages: _ri es el proximo a pisar (el mas viejo)
+        self._ring = [Message() for _ in range(max(2, ring))]
+        self._ri = 0
+        # nombre -> handler, usado por poll(). STATS se responde solo (on('STATS', None) lo quita)
+        self._handlers = {'STATS': self._responder_stats}
+        # Fragmentacion: origen (2 bytes del id), contador de mensajes y rearmados en curso
+        self.fragment = fragment
+        uid = machine.unique_id()
+        self._src = (uid[-2], uid[-1])
+        self._mid = 0
+        self._rearmados = []
+        # Entrega confiable: seq por destino, pendientes de ACK y ultimos recibidos
+        # (con el momento en que llegaron)
+        self._seq = {}
+        self._pendientes = []
+        self._vistos = [None] * DEDUPE
+        self._vistos_t = [0] * DEDUPE
+        self._visto_idx = 0
+        self._rol_b = b'A'
+        self._id_b = bytes(self.device_id, 'utf-8')
+        self.retransmisiones = 0
+        self.fallidos = 0
+        self.duplicados = 0
+        # Contadores de tramas (ver STATS_CAMPOS): enviadas, leidas de la cola y descartadas
+        # por actividad, grupo, filtro de nombre o formato. cola_llena cuenta las veces que
+        # se leyeron QUEUE tramas seguidas sin vaciar la cola: pudo haberse perdido alguna
+        self.tx = 0
+        self.rx = 0
+        self.otra_act = 0
+        self.otro_grupo = 0
+        self.filtrados = 0
+        self.malformados = 0
+        self.cola_llena = 0
+        self._racha = 0
+        # Agrupado: lote en armado, cuantos mensajes tiene y cuando empezo
+        self.coalesce = coalesce
+        self._tx = None
+        self._tx_n = 0
+        self._tx_t = 0
+        # Tramas internas de un lote recibido, se entregan antes de leer la radio
+        self._entrantes = []
+        # Filtro por hardware: direccion de la actividad y grupo de radio
+        self.hw_filter = hw_filter
+        self._address = direccion(self.activity) if hw_filter else DIR_BROADCAST
+        self._hw_group = 0
         radio.on()
-        radio.config(channel=channel, power=6, length=64, queue=10)
+        self._config_radio()
+
+    def _config_radio(self):
+        radio.config(channel=self.channel, power=6, length=LARGO, queue=QUEUE,
+                     address=self._address, group=self._hw_group)
 
     # Asigna grupo, rol y canal
-    def configure(self, group, role, channel=None):
+    # hw_group=True (con hw_filter): el grupo tambien se filtra por hardware. Solo para
+    # actividades sin trafico de grupo 0: los broadcasts de grupo 0 ya no llegan
+    def configure(self, group, role, channel=None, hw_group=False):
         self.group = str(group)
         self.role = str(role)
-        if channel is not None and channel != self.channel:
-            self.channel = channel
-            radio.config(channel=channel, power=6, length=64, queue=10)
+        self._grp_b = bytes(self.group, 'utf-8')
+        self._grp_n = self._to_int(self.group)
+        self._bypass = self.group == '0' and self.role == 'A'
+        self._rol_b = bytes(self.role, 'utf-8')
+        hw_grupo = self._grp_n & 0xFF if hw_group and self.hw_filter and isinstance(self._grp_n, int) else 0
+        if (channel is not None and channel != self.channel) or hw_grupo != self._hw_group:
+            if channel is not None:
+                self.channel = channel
+            self._hw_group = hw_grupo
+            self._config_radio()
+
+    # Cambia la direccion de radio a la de otra actividad (concentrador con hw_filter)
+    def tune(self, act):
+        if not self.hw_filter:
+            return
+        address = direccion(act)
+        if address != self._address:
+            self._address = address
+            self._config_radio()
 
     # Envia mensaje por radio
-    def send(self, name, *args, device_id=False, packed=False, CMD=True):
-        if CMD:
-            s = '_DGR' if device_id else '_GR'
-            payload = self.activity + ':' + self.cmd(name + s, *args, device_id=device_id, gr=True, packed=packed)
+    # reliable=True: reintenta hasta recibir ACK; to=rol o device_id que debe confirmar
+    def send(self, name, *args, device_id=False, packed=False, CMD=True, reliable=False, to=None):
+        trama = None
+        if CMD and self.binary:
+            if packed and len(args) == 1 and isinstance(args[0], (list, tuple)):
+                args = args[0]
+            trama = self._codificar(self.activity, name, self.device_id if device_id else None,
+                                    self.group, self.role, args)
+        if not trama:
+            if CMD:
+                s = '_DGR' if device_id else '_GR'
+                payload = self.activity + ':' + self.cmd(name + s, *args, device_id=device_id, gr=True, packed=packed)
+            else:
+                payload = name
+            trama = _TXT + bytes(str(payload), 'utf-8')
+        if reliable:
+            trama = self._envolver(trama, to)
+        return self._emitir(trama)
+
+    # Envia un mensaje armado campo por campo (lo usa el concentrador)
+    # Campos en None se omiten, igual que en el JSON del host
+    def send_fields(self, act, name, devID=None, grp=None, rol=None, valores=()):
+        if self.binary:
+            trama = self._codificar(act, name, devID, grp, rol, valores)
+            if trama:
+                return self._emitir(trama)
+        if devID and grp is not None and rol:
+            base = self._build(name + '_DGR', devID, grp, rol)
+        elif grp is not None and rol:
+            base = self._build(name + '_GR', grp, rol)
         else:
-            payload = name
-        radio.send(str(payload))
+            base = name
+        payload = act + ':' + base
+        if valores:
+            payload += ':' + ','.join(str(v) for v in valores)
+        return self._emitir(_TXT + bytes(payload, 'utf-8'))
+
+    # Envia una trama cruda; si no entra en LARGO la parte en fragmentos (con fragment)
+    # o la recorta. Con coalesce, las tramas chicas esperan en el lote hasta flush()
+    # Retorna False si el mensaje supera MAX_FRAGMENTOS
+    def _emitir(self, trama):
+        if self.coalesce and len(trama) < LARGO - 1:
+            if self._tx_n and len(self._tx) + 1 + len(trama) > LARGO:
+                self.flush()
+            if not self._tx_n:
+                self._tx = bytearray(1)
+                self._tx[0] = _LOTE
+                self._tx_t = running_time()
+            self._tx.append(len(trama))
+            self._tx.extend(trama)
+            self._tx_n += 1
+            return True
+        self.flush()
+        if len(trama) <= LARGO or not self.fragment:
+            radio.send_bytes(trama[:LARGO])
+            self.tx += 1
+            return True
+        cap = LARGO - _FRG_CAB
+        total = (len(trama) + cap - 1) // cap
+        if total > MAX_FRAGMENTOS:
+            return False
+        self._mid = (self._mid + 1) & 0xFF
+        cab = bytearray(_FRG_CAB)
+        cab[0], cab[1], cab[2], cab[3], cab[5] = _FRG, self._src[0], self._src[1], self._mid, total
+        for i in range(total):
+            cab[4] = i
+            radio.send_bytes(cab + trama[i * cap:(i + 1) * cap])
+        self.tx += total
+        return True
+
+    # Envia el lote en armado; si tiene un solo mensaje va sin el sobre de lote
+    def flush(self):
+        if not self._tx_n:
+            return
+        radio.send_bytes(self._tx if self._tx_n > 1 else self._tx[2:])
+        self.tx += 1
+        self._tx = None
+        self._tx_n = 0
+
+    # Agrega la cabecera confiable y deja la trama pendiente de ACK
+    def _envolver(self, trama, to):
+        dest = bytes(str(to), 'utf-8') if to else b''
+        # El seq arranca al azar en cada inicio: despues de reiniciar, los primeros
+        # mensajes no repiten los seq que el receptor todavia recuerda
+        seq = self._seq.get(dest)
+        seq = random.randint(0, 255) if seq is None else (seq + 1) & 0xFF
+        self._seq[dest] = seq
+        cab = bytearray(5)
+        cab[0], cab[1], cab[2], cab[3], cab[4] = _REL, self._src[0], self._src[1], seq, len(dest)
+        cab.extend(dest)
+        envuelta = cab + trama
+        if len(self._pendientes) >= MAX_PENDIENTES:
+            self._pendientes.pop(0)
+            self.fallidos += 1
+        # [clave de ACK, trama, reintentos, proximo envio]
+        self._pendientes.append([bytes(cab[1:]), envuelta, 0, running_time() + RTO])
+        return envuelta
+
+    # Retransmite los pendientes vencidos, con espera exponencial y algo de azar,
+    # y envia el lote en armado si vencio la ventana de coalesce
+    def tick(self):
+        if self._tx_n and running_time() - self._tx_t >= self.coalesce:
+            self.flush()
+        if not self._pendientes:
+            return
+        ahora = running_time()
+        for p in list(self._pendientes):
+            if ahora < p[3]:
+                continue
+            if p[2] >= MAX_REINTENTOS:
+                self._pendientes.remove(p)
+                self.fallidos += 1
+                continue
+            p[2] += 1
+            p[3] = ahora + (RTO << p[2]) + random.randint(0, RTO)
+            self.retransmisiones += 1
+            self._emitir(p[1])
+
+    # Trama confiable: entrega la trama interna una sola vez y confirma con ACK
+    def _recibir_confiable(self, raw, r, filter, full):
+        fin = 5 + raw[4]
+        if raw[4] and not (raw.startswith(self._rol_b, 5) and len(self._rol_b) == raw[4]) \
+                and not (raw.startswith(self._id_b, 5) and len(self._id_b) == raw[4]):
+            self.filtrados += 1
+            return r  # dirigida a otro rol/dispositivo
+        clave = raw[1:fin]
+        ahora = running_time()
+        for i in range(DEDUPE):
+            if self._vistos[i] == clave and ahora - self._vistos_t[i] < VISTO_MS:
+                self.duplicados += 1
+                self._confirmar(clave)
+                return r
+        self._trama(raw[fin:], r, filter, full)
+        if r.valid:
+            self._vistos[self._visto_idx] = clave
+            self._vistos_t[self._visto_idx] = ahora
+            self._visto_idx = (self._visto_idx + 1) % DEDUPE
+            self._confirmar(clave)
+        return r
+
+    def _confirmar(self, clave):
+        self._emitir(bytes((_ACK,)) + clave)
+
+    def _recibir_ack(self, raw):
+        if raw[1] != self._src[0] or raw[2] != self._src[1]:
+            return
+        clave = raw[1:]
+        for p in self._pendientes:
+            if p[0] == clave:
+                self._pendientes.remove(p)
+                return
+
+    # Guarda un fragmento; retorna la trama completa cuando llega el ultimo
+    def _rearmar(self, raw):
+        if len(raw) <= _FRG_CAB:
+            return None
+        clave = (raw[1] << 16) | (raw[2] << 8) | raw[3]
+        idx, total = raw[4], raw[5]
+        if idx >= total or total > MAX_FRAGMENTOS:
+            return None
+        ahora = running_time()
+        entrada = None
+        for e in list(self._rearmados):
+            if e[0] == clave and e[1] == total:
+                entrada = e
+            elif ahora - e[4] > TIMEOUT_REARMADO or e[0] == clave:
+                self._rearmados.remove(e)
+        if entrada is None:
+            if len(self._rearmados) >= MAX_REARMADOS:
+                self._rearmados.pop(0)
+            # [clave, total, recibidos, partes, inicio]
+            entrada = [clave, total, 0, [None] * total, ahora]
+            self._rearmados.append(entrada)
+        partes = entrada[3]
+        if partes[idx] is None:
+            partes[idx] = raw[_FRG_CAB:]
+            entrada[2] += 1
+        if entrada[2] < total:
+            return None
+        self._rearmados.remove(entrada)
+        return b''.join(partes)
 
+    # Retorna la trama cruda (bytes) o None si la cola esta vacia
     def _read(self):
-        raw = radio.receive()
+        if self._entrantes:
+            return self._entrantes.pop(0)
+        raw = radio.receive_bytes()
         if not raw:
+            self._racha = 0
             return None
-        msg_str = str(raw)
-        #print("RAW:{}".format(msg_str))
-        tipo = msg_str.split(':')[0] if ':' in msg_str else msg_str
-        return {'t': tipo, 'd': msg_str}
+        self.rx += 1
+        self._racha += 1
+        if self._racha == QUEUE:
+            self.cola_llena += 1
+        #print("RAW:{}".format(raw))
+        return raw
+
+    # Completa r a partir de una trama cruda de cualquier formato
+    def _trama(self, raw, r, filter, full):
+        try:
+            if raw[0] == _FRG:
+                raw = self._rearmar(raw)
+                if not raw:
+                    return r
+            if raw[0] == _LOTE:
+                self._desarmar_lote(raw)
+                if not self._entrantes:
+                    return r
+                raw = self._entrantes.pop(0)
+                return self._trama(raw, r, filter, full)
+            if raw[0] == _REL:
+                return self._recibir_confiable(raw, r, filter, full)
+            if raw[0] == _ACK:
+                self._recibir_ack(raw)
+                return r
+            if raw[0] == _BIN:
+                return self._procesar_bin(raw, r, filter, full)
+            if raw.startswith(_TXT):
+                return self._procesar(raw, r, filter, full)
+            self.malformados += 1
+        except:
+            r.valid = False
+            self.malformados += 1
+        return r
+
+    # Separa las tramas de un lote y las deja para los proximos _read()
+    def _desarmar_lote(self, raw):
+        i = 1
+        while i < len(raw):
+            n = raw[i]
+            if not n or i + 1 + n > len(raw):
+                break
+            self._entrantes.append(raw[i + 1:i + 1 + n])
+            i += 1 + n
+
+    # Compara el nombre contra filter (str, lista o dict de handlers) sin armar listas
+    def _pasa_filtro(self, name, filter):
+        if not filter:
+            return True
+        if isinstance(filter, str):
+            return name == filter
+        return name in filter
+
+    # Campo de grupo en raw[p:] aceptado: grupo 0 (broadcast) o el propio
+    def _grupo_ok(self, raw, p):
+        q = raw.find(b':', p)
+        if q < 0:
+            q = len(raw)
+        if q - p == 1 and raw[p] == 0x30:
+            return True
+        return q - p == len(self._grp_b) and raw.startswith(self._grp_b, p)
 
     # Recibe un mensaje, retorna Message
     # full=True: acepta mensajes de cualquier grupo (para concentrador)
+    # Los reintentos (tick) van despues de leer: un ACK que ya esta en la cola
+    # saca su mensaje de pendientes antes de que venza
     def receive(self, filter=None, full=False):
-        r = self._resultado
-        r._reset()
+        r = self._libre()
         m = self._read()
-        if not m:
+        if m:
+            self._trama(m, r, filter, full)
+            self._ocupar(r)
+        self.tick()
+        return r
+
+    # Vacia la cola de radio, retorna lista de Messages validos (hasta ring-1)
+    def receive_all(self, filter=None, full=False):
+        lote = []
+        tope = len(self._ring) - 1
+        # Tope de lecturas: la cola puede volver a llenarse mientras se vacia
+        for _ in range(2 * len(self._ring)):
+            if len(lote) == tope:
+                break
+            m = self._read()
+            if not m:
+                break
+            r = self._libre()
+            self._trama(m, r, filter, full)
+            if self._ocupar(r):
+                lote.append(r)
+        self.tick()
+        return lote
+
+    # Igual que receive_all() pero entrega los Messages de a uno
+    def receive_iter(self, filter=None, full=False):
+        for _ in range(2 * len(self._ring)):
+            m = self._read()
+            if not m:
+                break
+            r = self._libre()
+            self._trama(m, r, filter, full)
+            if self._ocupar(r):
+                yield r
+        self.tick()
+
+    # Message del anillo para la proxima trama, limpio
+    def _libre(self):
+        r = self._ring[self._ri]
+        r._reset()
+        return r
+
+    # Si r quedo valido lo deja en el anillo; si no, el lugar se reusa
+    def _ocupar(self, r):
+        if r.valid:
+            self._ri = (self._ri + 1) % len(self._ring)
+            return True
+        return False
+
+    # Registra handler(msg) para los mensajes llamados name (None lo quita)
+    def on(self, name, handler):
+        if handler is None:
+            self._handlers.pop(name, None)
+        else:
+            self._handlers[name] = handler
+
+    # Vacia la cola y entrega cada mensaje a su handler, retorna cuantos entrego
+    # Los nombres sin handler se descartan antes de decodificar el resto de la trama
+    def poll(self, full=False):
+        n = 0
+        for msg in self.receive_iter(self._handlers, full):
+            handler = self._handlers.get(msg.name)
+            if handler:
+                handler(msg)
+                n += 1
+        return n
+
+    # Contadores en el orden de STATS_CAMPOS
+    def stats(self):
+        return [self.tx, self.rx, self.otra_act, self.otro_grupo, self.filtrados, self.malformados,
+                self.cola_llena, self.retransmisiones, self.fallidos, self.duplicados]
+
+    # Handler por defecto de STATS: responde STATV con los contadores de STATV_CAMPOS
+    # Si el pedido trae devID, responde solo ese dispositivo
+    def _responder_stats(self, msg):
+        if msg.devID and msg.devID != self.device_id:
+            return
+        valores = (self.tx, self.rx, self.otra_act + self.otro_grupo + self.filtrados + self.malformados,
+                   self.cola_llena, self.retransmisiones, self.fallidos, self.duplicados)
+        self.send('STATV', [min(v, STATV_TOPE) for v in valores], packed=True)
+
+    # Completa r a partir de una trama de texto (cabecera _TXT incluida)
+    # Actividad y grupo se verifican sobre los bytes, antes de decodificar nada
+    def _procesar(self, raw, r, filter, full):
+        n = len(raw)
+        k = 3
+        if raw.startswith(self._pref, k):
+            r.act = self.activity
+            k += len(self._pref)
+        elif self._bypass:
+            j = raw.find(b':', k)
+            if j < 0:
+                self.malformados += 1
+                return r
+            r.act = str(raw[k:j], 'utf-8')
+            k = j + 1
+        else:
+            self.otra_act += 1
+            return r
+        fin = raw.find(b':', k)
+        if fin < 0:
+            fin = n
+        if fin - k >= 4 and raw.startswith(b'_DGR', fin - 4):
+            suf = 4
+        elif fin - k >= 3 and raw.startswith(b'_GR', fin - 3):
+            suf = 3
+        else:
+            suf = 0
+        p = fin + 1
+        if suf == 4:
+            p = raw.find(b':', p) + 1  # saltea devID
+            if p == 0:
+                self.malformados += 1
+                return r
+        if suf and not full and not self._grupo_ok(raw, p):
+            self.otro_grupo += 1
             return r
-        all_parts, args = self._parse(m['d'])
-        if not all_parts or len(args) < 1:
+        r.name = str(raw[k:fin - suf], 'utf-8')
+        if not self._pasa_filtro(r.name, filter):
+            self.filtrados += 1
             return r
-        r.act = all_parts
-        if r.act != self.activity:
-            if not (str(self.group) == '0' and str(self.role) == 'A'):
+        if suf:
+            if suf == 4:
+                r.devID = str(raw[fin + 1:p - 1], 'utf-8')
+            q = raw.find(b':', p)
+            if q < 0:
+                self.malformados += 1
                 return r
-        tipo = args[0]
-        args = args[1:]
-        sufijos = ('_DGR', '_GR')
-        sufijo = ''
-        for s in sufijos:  # la primitiva next() de microPython no acepta el parámetro default
-            if tipo.endswith(s):
-                sufijo = s
-                break # es ésto o un try-except(StopIteration), perdón Niklaus
-        r.name = tipo[:-len(sufijo)] if sufijo else tipo
-        expected = [filter] if isinstance(filter, str) else filter
-        if expected and r.name not in expected:
+            r.grp = self._to_int(str(raw[p:q], 'utf-8'))
+            p = q + 1
+            q = raw.find(b':', p)
+            if q < 0:
+                q = n
+            r.rol = str(raw[p:q], 'utf-8')
+            if q < n:
+                f = raw.find(b':', q + 1)
+                r._raw, r._vi, r._vf, r._modo = raw, q + 1, f if f >= 0 else n, _M_TXT
+        elif fin < n:
+            r._raw, r._vi, r._vf, r._modo = raw, fin + 1, n, _M_LIBRE
+        r.valid = True
+        return r
+
+    # Trama binaria:
+    #   0x02 | flags | len act | act | codigo (o len + nombre si _F_NOMBRE)
+    #   [devID 8 bytes si _F_DGR] [grupo 1 byte | len rol | rol si _F_GR/_F_DGR]
+    #   cantidad de valores | por valor: tipo (_V_INT: 2 bytes, _V_STR: len + texto)
+    def _procesar_bin(self, raw, r, filter, full):
+        flags = raw[1]
+        i = 3 + raw[2]
+        if raw[2] == len(self._act_b) and raw.startswith(self._act_b, 3):
+            r.act = self.activity
+        elif self._bypass:
+            r.act = str(raw[3:i], 'utf-8')
+        else:
+            self.otra_act += 1
             return r
-        vr = None
-        if sufijo == '_DGR':
-            if len(args) < 3: return r
-            r.devID, r.grp, r.rol = args[0], self._to_int(args[1]), args[2]
-            if len(args) >= 4: vr = args[3]
-        elif sufijo == '_GR':
-            if len(args) < 2: return r
-            r.grp, r.rol = self._to_int(args[0]), args[1]
-            if len(args) >= 3: vr = args[2]
+        if flags & _F_NOMBRE:
+            n = raw[i]
+            nombre = (i + 1, i + 1 + n)
+            i += 1 + n
         else:
-            if len(args) >= 1: vr = ','.join(str(a) for a in args)
-        if not full and r.grp is not None:
-            if r.grp != 0 and str(r.grp) != str(self.group):
+            nombre = None
+            i += 1
+        d = i
+        if flags & _F_DGR:
+            i += 8
+        g = i
+        if flags & (_F_DGR | _F_GR):
+            if not full and raw[g] != 0 and raw[g] != self._grp_n:
+                self.otro_grupo += 1
                 return r
-        if vr is not None:
-            r.valores = vr.split(',') if ',' in vr else [vr]
+            i += 2 + raw[g + 1]
+        r.name = str(raw[nombre[0]:nombre[1]], 'utf-8') if nombre else CODIGOS[raw[d - 1]]
+        if not self._pasa_filtro(r.name, filter):
+            self.filtrados += 1
+            return r
+        if flags & _F_DGR:
+            r.devID = ''.join(['{:02x}'.format(b) for b in raw[d:d + 8]])
+        if flags & (_F_DGR | _F_GR):
+            r.grp = raw[g]
+            r.rol = str(raw[g + 2:i], 'utf-8')
+        r._raw, r._vi, r._modo = raw, i, _M_BIN
         r.valid = True
         return r
 
-    def _parse(self, payload):
-        if not payload:
-            return (None, [])
-        partes = str(payload).split(':')
-        return (partes[0], partes[1:] if len(partes) > 1 else [])
+    # Arma una trama binaria, retorna None si algun campo no entra en el formato
+    def _codificar(self, act, name, devID, grp, rol, valores):
+        try:
+            b = bytearray(3)
+            b[0] = _BIN
+            a = bytes(act, 'utf-8')
+            b[2] = len(a)
+            b.extend(a)
+            flags = 0
+            if name in CODIGOS:
+                b.append(CODIGOS.index(name))
+            else:
+                flags |= _F_NOMBRE
+                n = bytes(name, 'utf-8')
+                b.append(len(n))
+                b.extend(n)
+            if devID and grp is not None and rol:
+                flags |= _F_DGR
+                if len(devID) != 16:
+                    return None
+                for k in range(0, 16, 2):
+                    b.append(int(devID[k:k + 2], 16))
+            elif grp is not None and rol:
+                flags |= _F_GR
+            if flags & (_F_DGR | _F_GR):
+                b.append(int(grp))
+                n = bytes(str(rol), 'utf-8')
+                b.append(len(n))
+                b.extend(n)
+            b.append(len(valores))
+            for v in valores:
+                if isinstance(v, int) and -0x8000 <= v < 0x8000:
+                    b.append(_V_INT)
+                    b.append((v >> 8) & 0xFF)
+                    b.append(v & 0xFF)
+                else:
+                    n = bytes(str(v), 'utf-8')
+                    b.append(_V_STR)
+                    b.append(len(n))
+                    b.extend(n)
+            b[1] = flags
+            return b
+        except:
+            return None
 
     def _build(self, cmd, *args):
         if args:
@@ -150,9 +767,50 @@ class Radio:
             return x
 
 
+# Turnos (TDMA) para responder un broadcast sin chocar: REPORT->ID, PING->PONG, etc.
+# Quien pregunta anuncia ancho de turno y cantidad de turnos en los valores del mensaje
+class SlotScheduler:
+    def __init__(self, slot_ms=20, slots=54, jitter=0):
+        self.slot_ms = slot_ms
+        self.slots = slots
+        self.jitter = jitter
+
+    # Espera (ms) antes de responder para el turno index
+    # valores: [slot_ms, slots] anunciados por quien pregunta; si faltan, los propios
+    # Un index fuera de los turnos anunciados responde despues de la ventana, sin
+    # pisar el turno de otro dispositivo
+    def delay(self, index, valores=None):
+        slot_ms, slots = self.slot_ms, self.slots
+        if valores and len(valores) >= 2:
+            try:
+                slot_ms, slots = int(valores[0]), int(valores[1])
+            except:
+                pass
+        if slots < 1:
+            return 0
+        espera = index * slot_ms
+        if self.jitter:
+            espera += random.randint(0, min(self.jitter, slot_ms // 2))
+        return espera
+
+    # Duerme hasta el turno index
+    def wait(self, index, valores=None):
+        espera = self.delay(index, valores)
+        if espera:
+            sleep(espera)
+        return espera
+
+    # Duracion total de la ventana (ms), para que quien pregunta sepa cuanto esperar
+    def window(self):
+        return self.slot_ms * self.slots
+
+
 # Persistencia de configuracion en flash
 class ConfigManager:
-    def __init__(self, config_file='config.cfg', roles=None, grupos_max=9, grupos_min=1, extra_fields=None):
+    # debounce_ms > 0: save() no escribe enseguida, la escritura la hace tick() cuando
+    # pasan debounce_ms sin cambios, o flush()
+    def __init__(self, config_file='config.cfg', roles=None, grupos_max=9, grupos_min=1, extra_fields=None,
+                 debounce_ms=0):
         self.config_file = config_file
         self.roles = roles or ['A', 'B', 'Z']
         self.grupos_max = grupos_max
@@ -160,57 +818,160 @@ class ConfigManager:
         self.config = {'role': self.roles[0], 'grupo': self.grupos_min}
         if extra_fields:
             self.config.update(extra_fields)
+        self.debounce_ms = debounce_ms
+        # Claves modificadas desde la ultima escritura (todas, hasta que load() funcione)
+        self._dirty = set(self.config)
+        self._t_dirty = running_time()
+        self._pendiente = False
+        # Doble copia en flash: se escribe siempre la que no tiene el dato vigente
+        self._archivos = (config_file, config_file + '.2')
+        self._seq = -1
+        self._copia = 1
+
+    # Lee una copia: retorna (seq, dict) o None si falta o quedo cortada
+    # Los archivos sin _seq/_sum (version anterior) valen con seq 0
+    def _leer(self, nombre):
+        try:
+            with open(nombre, 'r') as f:
+                content = f.read()
+        except Exception:
+            return None
+        if not content.strip():
+            return None
+        seq = 0
+        datos = {}
+        if content.startswith('_seq='):
+            fin = content.rfind('_sum=')
+            if fin < 0:
+                return None
+            try:
+                if int(content[fin + 5:].strip()) != self._suma(content[:fin]):
+                    return None
+            except ValueError:
+                return None
+            content = content[:fin]
+        for linea in content.strip().split('\n'):
+            if '=' in linea:
+                k, v = linea.split('=', 1)
+                k, v = k.strip(), v.strip()
+                if k == '_seq':
+                    seq = int(v)
+                else:
+                    datos[k] = v
+        return seq, datos
+
+    @staticmethod
+    def _suma(texto):
+        h = 0
+        for b in bytes(texto, 'utf-8'):
+            h = (h * 31 + b) & 0xFFFF
+        return h
+
+    # Busca la copia valida mas nueva: retorna su dict o None
+    def _ultima(self):
+        mejor = None
+        self._seq, self._copia = 0, 1
+        for i in (0, 1):
+            leido = self._leer(self._archivos[i])
+            if leido and (mejor is None or leido[0] > self._seq):
+                mejor = leido[1]
+                self._seq, self._copia = leido[0], i
+        return mejor
 
     # Carga config desde archivo
     def load(self):
         try:
-            with open(self.config_file, 'r') as f:
-                content = f.read().strip()
-            if not content:
+            datos = self._ultima()
+            if not datos:
                 return False
-            for linea in content.split('\n'):
-                if '=' in linea:
-                    k, v = linea.split('=', 1)
-                    k, v = k.strip(), v.strip()
-                    if k in self.config:
-                        if k == 'grupo':
+            for k in datos:
+                v = datos[k]
+                if k in self.config:
+                    if k == 'grupo':
+                        self.config[k] = int(v)
+                    elif v == 'None':
+                        self.config[k] = None
+                    else:
+                        try:
                             self.config[k] = int(v)
-                        elif v == 'None':
-                            self.config[k] = None
-                        else:
-                            try:
-                                self.config[k] = int(v)
-                            except:
-                                self.config[k] = v
+                        except:
+                            self.config[k] = v
+            self._dirty = set()
+            self._pendiente = False
             return True
         except Exception as e:
             #print("CFG:Error:{}".format(str(e)))
             return False
 
-    # Guarda config en archivo
+    # Guarda config en archivo (o la agenda, con debounce_ms)
+    # Sin cambios desde la ultima escritura no toca la flash
     def save(self):
+        if not self._dirty:
+            return True
+        if self.debounce_ms:
+            self._pendiente = True
+            return True
+        return self.flush()
+
+    # Escribe ya los cambios pendientes, en la copia que no tiene el dato vigente
+    def flush(self):
+        if not self._dirty:
+            self._pendiente = False
+            return True
         try:
-            f = open(self.config_file, 'w')
+            if self._seq < 0:
+                self._ultima()
+            seq = self._seq + 1
+            copia = 1 - self._copia
+            texto = "_seq={}\n".format(seq)
             for k in self.config:
-                f.write("{}={}\n".format(k, self.config[k]))
+                texto += "{}={}\n".format(k, self.config[k])
+            f = open(self._archivos[copia], 'w')
+            f.write(texto)
+            f.write("_sum={}\n".format(self._suma(texto)))
             f.close()
+            self._seq, self._copia = seq, copia
+            self._dirty = set()
+            self._pendiente = False
             return True
         except:
             return False
 
+    # Llamar en el loop: escribe lo agendado por save() cuando pasa debounce_ms sin cambios
+    def tick(self):
+        if self._pendiente and running_time() - self._t_dirty >= self.debounce_ms:
+            self.flush()
+
+    def _marcar(self, key):
+        self._dirty.add(key)
+        self._t_dirty = running_time()
+
     # Obtiene un valor de config
     def get(self, key):
         return self.config.get(key)
 
     # Modifica un valor de config
     def set(self, key, value):
-        if key in self.config:
+        if key in self.config and self.config[key] != value:
             self.config[key] = value
+            self._marcar(key)
+
+    # Turno de este dispositivo: uno por combinacion grupo/rol, de 0 en adelante
+    def slot(self):
+        rol = self.config.get('role')
+        indice_rol = self.roles.index(rol) if rol in self.roles else 0
+        grupo = self.config.get('grupo') or self.grupos_min
+        return (grupo - self.grupos_min) * len(self.roles) + indice_rol
+
+    # Cantidad de turnos distintos (grupos x roles)
+    def slots(self):
+        return (self.grupos_max - self.grupos_min + 1) * len(self.roles)
 
     # Avanza al siguiente rol
     def next_role(self):
         idx = self.roles.index(self.config['role']) if self.config['role'] in self.roles else 0
         self.config['role'] = self.roles[(idx + 1) % len(self.roles)]
+        self._marcar('role')
         return self.config['role']
 
     # Avanza al siguiente grupo
@@ -218,6 +979,7 @@ class ConfigManager:
         g = self.config.get('grupo', self.grupos_min)
         rango = self.grupos_max - self.grupos_min + 1
         self.config['grupo'] = ((g - self.grupos_min + 1) % rango) + self.grupos_min
+        self._marcar('grupo')
         return self.config['grupo']
 
     # Modo configuracion: pin1 + botones A/B
@@ -229,17 +991,18 @@ class ConfigManager:
         while p1.is_touched():
             if ba.was_pressed():
                 self.next_role()
-                self.save()
                 changed = True
                 if cb: cb()
                 while ba.is_pressed(): sleep(50)
             if bb.was_pressed():
                 self.next_group()
-                self.save()
                 changed = True
                 if cb: cb()
                 while bb.is_pressed(): sleep(50)
             sleep(50)
+        # Una sola escritura al salir, no una por toque
+        if changed:
+            self.flush()
         display.clear()
         sleep(200)
         return changed
\ No newline at end of file
@@ -0,0 +1,10 @@
+# simulador/__init__.py
+# Simulador de micro:bit para CPython: modulos microbit/radio/machine/music sobre
+# un eter de radio virtual, para correr muchas placas sin hardware
+from simulador.eter import Eter, RadioVirtual
+from simulador.dispositivo import Dispositivo, Detenido, Reinicio, actual, instalar
+from simulador.cargar import cargar
+from simulador.aula import Aula
+
+__all__ = ['Eter', 'RadioVirtual', 'Dispositivo', 'Detenido', 'Reinicio', 'actual',
+           'instalar', 'cargar', 'Aula']
@@ -0,0 +1,50 @@
+# simulador/__main__.py
+# Corre varios scripts de micro:bit a la vez sobre el eter virtual
+#
+#   python -m simulador mbContador/main.py=3 --segundos 10
+#   python -m simulador mbPerceptron/perceptron.py=3 --perdida 0.1 --escala 2
+import argparse
+import sys
+
+from simulador.aula import Aula
+
+
+def _script(arg):
+    # ruta=N: N copias del mismo script
+    ruta, _, copias = arg.rpartition('=')
+    if ruta and copias.isdigit():
+        return ruta, int(copias)
+    return arg, 1
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog='python -m simulador',
+                                description='Simulador de aula de micro:bits')
+    p.add_argument('scripts', nargs='+', help='script.py o script.py=N (N copias)')
+    p.add_argument('--segundos', type=float, default=10, help='tiempo virtual a simular')
+    p.add_argument('--perdida', type=float, default=0.0, help='probabilidad de perder cada trama')
+    p.add_argument('--latencia', type=float, default=1.0, help='latencia de radio en ms')
+    p.add_argument('--jitter', type=float, default=0.0, help='variacion de latencia en ms')
+    p.add_argument('--sin-colisiones', action='store_true', help='no simular choques en el aire')
+    p.add_argument('--escala', type=float, default=1.0, help='>1 acelera el tiempo virtual')
+    p.add_argument('--semilla', type=int, default=None)
+    p.add_argument('--quieto', action='store_true', help='no mostrar lo que imprime cada placa')
+    args = p.parse_args(argv)
+
+    aula = Aula(eco=not args.quieto, perdida=args.perdida, latencia_ms=args.latencia,
+                jitter_ms=args.jitter, colisiones=not args.sin_colisiones,
+                escala=args.escala, semilla=args.semilla)
+    for arg in args.scripts:
+        ruta, copias = _script(arg)
+        aula.agregar(ruta, copias)
+    try:
+        aula.correr(args.segundos * 1000)
+    except KeyboardInterrupt:
+        pass
+    aula.detener()
+    print(aula.resumen())
+    return 1 if any(d.error for d in aula.dispositivos) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
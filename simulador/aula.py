@@ -0,0 +1,50 @@
+# simulador/aula.py
+# Un aula: un eter y N dispositivos corriendo sus scripts a la vez
+from simulador.dispositivo import Dispositivo, instalar
+from simulador.eter import Eter
+
+
+class Aula:
+    def __init__(self, eter=None, eco=True, **kwargs_eter):
+        instalar()
+        self.eter = eter or Eter(**kwargs_eter)
+        self.eco = eco
+        self.dispositivos = []
+
+    def agregar(self, script=None, copias=1, objetivo=None, nombre=None):
+        """Agrega `copias` dispositivos que corren el mismo script. Retorna la lista."""
+        nuevos = []
+        for _ in range(copias):
+            indice = len(self.dispositivos)
+            disp = Dispositivo(self.eter, script=script, objetivo=objetivo, indice=indice,
+                               nombre=nombre if copias == 1 else None, eco=self.eco)
+            self.dispositivos.append(disp)
+            nuevos.append(disp)
+        return nuevos
+
+    def arrancar(self):
+        for disp in self.dispositivos:
+            if not disp.vivo():
+                disp.arrancar()
+
+    def correr(self, ms):
+        """Arranca los que falten y deja correr el aula `ms` milisegundos virtuales."""
+        self.arrancar()
+        self.eter.dormir(ms)
+
+    def detener(self):
+        for disp in self.dispositivos:
+            disp._detener = True
+        for disp in self.dispositivos:
+            disp.detener()
+
+    def resumen(self):
+        """Texto con las estadisticas del eter y de cada radio."""
+        columnas = ('enviadas', 'entregadas', 'filtradas', 'perdidas', 'colisiones', 'cola_llena')
+        lineas = ['{:<8}'.format('') + ''.join(f"{c:>12}" for c in columnas)]
+        for disp in self.dispositivos:
+            st = disp.radio.stats
+            lineas.append(f"{disp.nombre:<8}" + ''.join(f"{st[c]:>12}" for c in columnas))
+        st = self.eter.stats
+        lineas.append(f"{'eter':<8}" + ''.join(f"{st[c]:>12}" for c in columnas))
+        return '\n'.join(lineas)
@@ -0,0 +1,432 @@
+# simulador/carga.py
+# Generador de carga: un concentrador falso con N estudiantes virtuales detras,
+# en una pseudo-terminal a la que se conecta la app de escritorio
+#
+#   python -m simulador.carga --dispositivos 100 --perdida 0.02 --respuesta normal:15,5
+#
+# Imprime la ruta de la pty (ej: /dev/pts/7): elegirla como puerto en la GUI.
+# Comandos por teclado: a = boton A (descubrimiento), b = boton B (PING a todos),
+# r = resumen, q = salir.
+import argparse
+import heapq
+import json
+import os
+import random
+import select
+import sys
+import threading
+import time
+import tty
+from types import SimpleNamespace
+
+from simulador.cargar import cargar
+from simulador.dispositivo import instalar
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONCENTRADOR = os.path.join(RAIZ, 'mbClassquiz', 'concentrador.py')
+
+ACTIVITY = 'cqz'
+ROLES    = ['A', 'B', 'C', 'D', 'E', 'Z']   # mismos que ClassquizApp
+SLOT_MS  = 108                              # SLOT_MS_DEFAULT de classquiz.py
+CHECK_REG_MS = 5000                         # classquiz.py reenvia CHECK_REG cada 5 s
+SILENCIO = 2.0                              # segundos sin comandos que cierran una fase
+
+
+def distribucion(texto):
+    """'fija:5', 'uniforme:5,50', 'normal:30,10' o 'exp:20' -> funcion que da ms."""
+    tipo, _, args = texto.partition(':')
+    nums = [float(x) for x in args.split(',') if x]
+    if tipo == 'fija':
+        return lambda: nums[0]
+    if tipo == 'uniforme':
+        return lambda: random.uniform(nums[0], nums[1])
+    if tipo == 'normal':
+        return lambda: max(0.0, random.gauss(nums[0], nums[1]))
+    if tipo == 'exp':
+        return lambda: random.expovariate(1.0 / nums[0])
+    raise argparse.ArgumentTypeError(f"Distribucion desconocida: {texto}")
+
+
+def _percentil(datos, p):
+    if not datos:
+        return 0.0
+    datos = sorted(datos)
+    return datos[min(len(datos) - 1, int(p * len(datos)))]
+
+
+class Estudiante:
+    def __init__(self, indice):
+        self.indice     = indice
+        self.device_id  = '{:016x}'.format(0x5100000000000000 + indice + 1)
+        self.grp        = str(indice // len(ROLES) + 1)
+        self.rol        = ROLES[indice % len(ROLES)]
+        self.slot       = indice
+        self.registrado = False
+        self.opciones   = 4
+        self.tx         = 0
+        self.rx         = 0
+        self.proximo_check = None
+
+
+class Fase:
+    """Una rafaga de comandos de la PC (descubrimiento, PING o POLL) y sus tiempos."""
+
+    def __init__(self, nombre, ahora):
+        self.nombre     = nombre
+        self.inicio     = ahora
+        self.ultimo     = ahora
+        self.comandos   = 0
+        self.respuestas = 0
+        self.confirmados = 0
+        self.latencias  = []     # respuesta del estudiante -> comando de la PC, en ms
+
+    def resumen(self, total):
+        dur = self.ultimo - self.inicio
+        lat = self.latencias
+        return (f"[{self.nombre}] {dur:.2f} s  comandos={self.comandos}  "
+                f"respuestas={self.respuestas}  confirmados={self.confirmados}/{total}  "
+                f"latencia PC p50={_percentil(lat, 0.5):.1f} ms p95={_percentil(lat, 0.95):.1f} ms "
+                f"max={max(lat) if lat else 0:.1f} ms")
+
+
+class Generador:
+    def __init__(self, dispositivos, respuesta, perdida, check_reg=True, semilla=None):
+        instalar()
+        random.seed(semilla)
+        # Misma serializacion y mismos turnos que el firmware
+        firmware = cargar(CONCENTRADOR)
+        self.radio_a_json = firmware['radio_a_json']
+        self.lineas_usb   = firmware['lineas_usb']
+        self.max_lote     = firmware['MAX_LOTE']
+        # POLL_ALL: lo que tarda el concentrador con quien no contesta
+        self.espera_poll  = firmware['POLL_TIMEOUT_MS'] * (firmware['POLL_REINTENTOS'] + 1)
+        self._barrido     = None
+        # TALLY: el mismo conteo que lleva el concentrador
+        self.conteo       = firmware['Conteo']()
+        self.roster       = []
+        # REG_SET: el generador contesta CHECK_REG como el concentrador
+        self.registro     = firmware['Registro']()
+        from microbitml import SlotScheduler
+        self.turnos     = SlotScheduler(slot_ms=SLOT_MS, slots=9 * len(ROLES))
+        self.estudiantes = [Estudiante(i) for i in range(dispositivos)]
+        self.por_id     = {e.device_id: e for e in self.estudiantes}
+        self.respuesta  = respuesta
+        self.perdida    = perdida
+        self.check_reg  = check_reg
+        self._cola      = []          # (t, seq, linea, clave) por enviar
+        self._seq       = 0
+        self._lock      = threading.Lock()
+        self._pendientes = {}         # (nombre, devID) -> t de la respuesta enviada
+        self.fases      = []
+        self.fase       = None
+        self._salir     = False
+        self.maestro, self.esclavo = os.openpty()
+        tty.setraw(self.esclavo)
+        os.set_blocking(self.maestro, False)
+        self.descartadas = 0
+        self.puerto = os.ttyname(self.esclavo)
+
+    # ------------------------------------------------------------------
+    # Salida hacia la PC
+    # ------------------------------------------------------------------
+    def _json(self, name, est=None, valores=(), devID=True):
+        msg = SimpleNamespace(name=name, act=ACTIVITY, valores=list(valores),
+                              devID=est.device_id if est and devID else None,
+                              grp=est.grp if est else None, rol=est.rol if est else None)
+        return self.radio_a_json(msg)
+
+    def _escribir(self, linea):
+        # Sin la PC leyendo, el buffer de la pty se llena: se descarta como el USB
+        try:
+            os.write(self.maestro, (linea + '\n').encode('utf-8'))
+        except BlockingIOError:
+            self.descartadas += 1
+
+    def _enviar_lote(self, items):
+        for linea in self.lineas_usb(items):
+            self._escribir(linea)
+
+    def _agendar(self, demora_ms, linea, clave=None, est=None, perdible=True):
+        if est:
+            est.tx += 1
+        if perdible and self.perdida and random.random() < self.perdida:
+            return
+        with self._lock:
+            self._seq += 1
+            heapq.heappush(self._cola, (time.monotonic() + demora_ms / 1000.0, self._seq, linea, clave))
+
+    def _despachar(self):
+        # Lo que vence en la misma pasada sale agrupado, como en manejar_radio
+        ahora = time.monotonic()
+        espera = 0.05
+        items = []
+        while True:
+            with self._lock:
+                if not self._cola or self._cola[0][0] > ahora:
+                    if self._cola:
+                        espera = min(espera, self._cola[0][0] - ahora)
+                    break
+                _, _, linea, clave = heapq.heappop(self._cola)
+                if clave:
+                    self._pendientes[clave] = ahora
+                if self.fase and not (clave and clave[0] == 'CHECK_REG') and not linea.startswith('{"event"'):
+                    self.fase.respuestas += 1
+            items.append(linea)
+            if len(items) == self.max_lote:
+                self._enviar_lote(items)
+                items = []
+        self._enviar_lote(items)
+        return max(0.0, espera)
+
+    def evento(self, nombre):
+        self._escribir('{{"event":"{}"}}'.format(nombre))
+
+    # ------------------------------------------------------------------
+    # Entrada desde la PC
+    # ------------------------------------------------------------------
+    def _fase(self, nombre, ahora):
+        if self.fase is None or self.fase.nombre != nombre or ahora - self.fase.ultimo > SILENCIO:
+            self._cerrar_fase()
+            self.fase = Fase(nombre, ahora)
+        self.fase.ultimo = ahora
+        self.fase.comandos += 1
+
+    def _cerrar_fase(self):
+        if self.fase:
+            self.fases.append(self.fase)
+            print(self.fase.resumen(len(self.estudiantes)))
+            self.fase = None
+
+    def _confirmar(self, clave, ahora):
+        enviada = self._pendientes.pop(clave, None)
+        if enviada is not None and self.fase:
+            self.fase.latencias.append((ahora - enviada) * 1000.0)
+            self.fase.confirmados += 1
+
+    def _destinatarios(self, msg):
+        dev = msg.get('devID')
+        if dev:
+            est = self.por_id.get(dev)
+            return [est] if est else []
+        grp, rol = msg.get('grp'), msg.get('rol')
+        if grp in (None, 0, '0'):
+            return self.estudiantes
+        return [e for e in self.estudiantes if e.grp == str(grp) and (rol in (None, 'est') or e.rol == rol)]
+
+    def procesar(self, linea):
+        try:
+            msg = json.loads(linea)
+        except ValueError:
+            print(f"[carga] JSON invalido: {linea}")
+            return
+        name  = msg.get('name')
+        if not name:
+            # Pedido de formato del enlace: el generador solo habla JSON
+            if 'usb' in msg:
+                self._escribir('{"event":"usb","modo":"txt"}')
+            return
+        ahora = time.monotonic()
+        if name == 'POLL_ALL':
+            self._poll_all(msg.get('valores') or [], ahora)
+            return
+        if name == 'REG_SET':
+            self.registro.cargar(msg.get('valores') or [])
+            return
+        if name == 'TALLY':
+            valores = msg.get('valores') or []
+            if valores and valores[0] in ('solo', 'todo'):
+                self.conteo.solo = valores[0] == 'solo'
+            else:
+                self._escribir(self.conteo.resumen(self.roster))
+            return
+        # Un estudiante perdido no escucha el comando
+        destinos = [e for e in self._destinatarios(msg)
+                    if not (self.perdida and random.random() < self.perdida)]
+        for est in destinos:
+            est.rx += 1
+        if name == 'REPORT':
+            self._fase('descubrimiento', ahora)
+            for est in self.estudiantes:
+                est.registrado = False
+            for est in destinos:
+                demora = self.turnos.delay(est.slot, msg.get('valores')) + self.respuesta()
+                self._agendar(demora, self._json('ID', est), ('ID', est.device_id), est=est)
+        elif name == 'ACK':
+            self.registro.ack(msg.get('devID'), msg.get('grp'), msg.get('rol'))
+            for est in destinos:
+                est.registrado = True
+                self._confirmar(('ID', est.device_id), ahora)
+            if self.fase:
+                self.fase.ultimo = ahora
+        elif name == 'REG_STATUS':
+            for est in destinos:
+                self._confirmar(('CHECK_REG', est.device_id), ahora)
+                if (msg.get('valores') or [''])[0] == 'OK':
+                    est.registrado = True
+        elif name == 'PING':
+            self._fase('ping', ahora)
+            for est in destinos:
+                self._agendar(self.respuesta(), self._json('PONG', est), est=est)
+        elif name == 'QPARAMS':
+            self.conteo.reiniciar()
+            valores = msg.get('valores') or []
+            for est in destinos:
+                try:
+                    est.opciones = int(valores[1])
+                except (IndexError, ValueError):
+                    pass
+        elif name == 'STATS':
+            # Contadores en el orden de microbitml.STATV_CAMPOS, sin devID; el resto en 0
+            for est in destinos:
+                valores = [str(est.tx), str(est.rx)] + ['0'] * 5
+                self._agendar(self.respuesta(), self._json('STATV', est, valores, devID=False), est=est)
+        elif name == 'POLL':
+            self._fase('polling', ahora)
+            # La ultima respuesta que se confirma es el proximo POLL
+            for clave in [c for c in self._pendientes if c[0] == 'ANSWER']:
+                self._confirmar(clave, ahora)
+            for est in destinos:
+                voto = [chr(ord('A') + random.randrange(max(1, min(est.opciones, 4))))]
+                if self._contar(est, voto):
+                    continue
+                self._agendar(self.respuesta(), self._json('ANSWER', est, voto), ('ANSWER', est.device_id), est=est)
+
+    def _contar(self, est, voto):
+        # True si el ANSWER no se reenvia (TALLY ["solo"]): queda solo en el conteo
+        self.conteo.agregar(SimpleNamespace(grp=est.grp, rol=est.rol, valores=voto))
+        return self.conteo.solo
+
+    def _poll_all(self, valores, ahora):
+        # Como Barrido del firmware: un estudiante por vez, quien no contesta
+        # cuesta todos los reintentos; al final poll_end con los que faltaron
+        if len(valores) < 2:
+            return
+        if valores[0] == '0':
+            self._barrido = {'total': int(valores[1]), 'hechos': 0, 'sin': [], 't0': ahora, 'ms': 0.0}
+            self._escribir('{{"event":"poll_start","total":{}}}'.format(valores[1]))
+            self.roster = []
+        b = self._barrido
+        if b is None:
+            return
+        self._fase('polling', ahora)
+        demora = b['ms'] - (ahora - b['t0']) * 1000.0
+        for entrada in valores[2:]:
+            grp, _, rol = entrada.partition(':')
+            self.roster.append(entrada)
+            est = next((e for e in self.estudiantes if e.grp == grp and e.rol == rol), None)
+            b['hechos'] += 1
+            if est is None or (self.perdida and random.random() < self.perdida):
+                demora += self.espera_poll
+                b['sin'].append(entrada)
+                continue
+            est.rx += 1
+            demora += self.respuesta()
+            voto = [chr(ord('A') + random.randrange(max(1, min(est.opciones, 4))))]
+            if self._contar(est, voto):
+                continue
+            # La perdida ya se sorteo arriba: lo que el barrido cuenta como respondido llega
+            self._agendar(demora, self._json('ANSWER', est, voto), est=est, perdible=False)
+        b['ms'] = demora + (ahora - b['t0']) * 1000.0
+        if b['hechos'] >= b['total']:
+            fin = '{{"event":"poll_end","total":{},"sin_respuesta":{}}}'.format(
+                b['total'], json.dumps(b['sin'], separators=(',', ':')))
+            self._agendar(demora + 1, fin, perdible=False)
+            self._barrido = None
+
+    def _check_reg_local(self, est):
+        # Con REG_SET el concentrador contesta solo: a la PC llegan los cambios
+        msg = SimpleNamespace(devID=est.device_id, grp=est.grp, rol=est.rol)
+        estado = self.registro.estado(msg)
+        if estado == 'OK':
+            est.registrado = True
+        if self.registro.cambio(est.device_id, estado):
+            self._agendar(self.respuesta(), '{{"event":"check_reg","devID":"{}","grp":{},"rol":"{}","estado":"{}"}}'.format(
+                est.device_id, est.grp, est.rol, estado), est=est)
+
+    def _check_reg(self):
+        # Como classquiz.py: CHECK_REG al arrancar y cada 5 s hasta quedar registrado
+        ahora = time.monotonic()
+        for est in self.estudiantes:
+            if est.proximo_check is None:
+                # Las placas no arrancan todas a la vez
+                est.proximo_check = ahora + random.uniform(0, CHECK_REG_MS / 1000.0)
+            elif not est.registrado and ahora >= est.proximo_check and self.registro.activo:
+                self._check_reg_local(est)
+                est.proximo_check = ahora + CHECK_REG_MS / 1000.0 * random.uniform(0.9, 1.1)
+            elif not est.registrado and ahora >= est.proximo_check:
+                self._agendar(self.respuesta(), self._json('CHECK_REG', est), ('CHECK_REG', est.device_id), est=est)
+                est.proximo_check = ahora + CHECK_REG_MS / 1000.0 * random.uniform(0.9, 1.1)
+
+    # ------------------------------------------------------------------
+    # Loop
+    # ------------------------------------------------------------------
+    def correr(self, descubrir=None):
+        print(f"[carga] {len(self.estudiantes)} estudiantes en {self.puerto}")
+        self.evento('gateway_ready')
+        if descubrir is not None:
+            threading.Timer(descubrir, self.evento, ('button_a',)).start()
+        entradas = [self.maestro]
+        if sys.stdin.isatty():
+            entradas.append(sys.stdin)
+        buffer = b''
+        while not self._salir:
+            espera = self._despachar()
+            if self.check_reg:
+                self._check_reg()
+            listos, _, _ = select.select(entradas, [], [], min(espera, 0.05))
+            if self.maestro in listos:
+                try:
+                    buffer += os.read(self.maestro, 4096)
+                except BlockingIOError:
+                    pass
+                except OSError:
+                    buffer = b''
+                while b'\n' in buffer:
+                    linea, buffer = buffer.split(b'\n', 1)
+                    linea = linea.decode('utf-8', 'ignore').strip()
+                    if linea:
+                        self.procesar(linea)
+            if sys.stdin in listos:
+                self._teclado(sys.stdin.readline().strip())
+            if self.fase and time.monotonic() - self.fase.ultimo > SILENCIO and not self._cola:
+                self._cerrar_fase()
+        self._cerrar_fase()
+
+    def _teclado(self, comando):
+        if comando == 'a':
+            self.evento('button_a')
+        elif comando == 'b':
+            self.evento('button_b')
+        elif comando == 'r':
+            registrados = sum(1 for e in self.estudiantes if e.registrado)
+            print(f"[carga] registrados {registrados}/{len(self.estudiantes)}")
+            for fase in self.fases:
+                print(fase.resumen(len(self.estudiantes)))
+        elif comando == 'q':
+            self._salir = True
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog='python -m simulador.carga',
+                                description='Concentrador falso con estudiantes virtuales en una pty')
+    p.add_argument('--dispositivos', type=int, default=30)
+    p.add_argument('--respuesta', type=distribucion, default=distribucion('uniforme:5,30'),
+                   help="demora de cada respuesta: fija:MS, uniforme:MIN,MAX, normal:MEDIA,DESVIO, exp:MEDIA")
+    p.add_argument('--perdida', type=float, default=0.0,
+                   help='probabilidad de perder cada comando o respuesta')
+    p.add_argument('--sin-check-reg', action='store_true',
+                   help='no enviar CHECK_REG periodicos de los no registrados')
+    p.add_argument('--descubrir', type=float, default=None, metavar='SEG',
+                   help='enviar button_a (descubrimiento) a los SEG segundos')
+    p.add_argument('--semilla', type=int, default=None)
+    args = p.parse_args(argv)
+    gen = Generador(args.dispositivos, args.respuesta, args.perdida,
+                    check_reg=not args.sin_check_reg, semilla=args.semilla)
+    try:
+        gen.correr(descubrir=args.descubrir)
+    except KeyboardInterrupt:
+        gen._cerrar_fase()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+# simulador/cargar.py
+# Carga las clases de un script de micro:bit sin arrancar su loop
+import ast
+import os
+import sys
+
+from simulador.dispositivo import _open_original
+
+
+def _es_arranque(nodo):
+    # Llamadas sueltas al final del script: PerceptronApp().run(), display.scroll(...)
+    if isinstance(nodo, ast.Expr) and isinstance(nodo.value, ast.Call):
+        return True
+    # if __name__ == '__main__': ...
+    if isinstance(nodo, ast.If) and isinstance(nodo.test, ast.Compare):
+        izq = nodo.test.left
+        return isinstance(izq, ast.Name) and izq.id == '__name__'
+    return False
+
+
+def cargar(ruta):
+    """Ejecuta el script sin sus llamadas de nivel superior y retorna su namespace.
+
+    Sirve para instanciar las clases de una actividad (ClassQuiz, Concentrador,
+    MbContador...) y manejarlas paso a paso. Las instancias tocan el hardware
+    simulado, asi que hay que crearlas dentro de Dispositivo.contexto().
+    """
+    with _open_original(ruta, 'r', encoding='utf-8') as f:
+        arbol = ast.parse(f.read(), ruta)
+    arbol.body = [n for n in arbol.body if not _es_arranque(n)]
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    if carpeta not in sys.path:
+        sys.path.append(carpeta)
+    nombre = os.path.splitext(os.path.basename(ruta))[0]
+    ns = {'__name__': f"sim_{nombre}", '__file__': ruta}
+    exec(compile(arbol, ruta, 'exec'), ns)
+    return ns
@@ -0,0 +1,265 @@
+# simulador/dispositivo.py
+# Un micro:bit simulado: corre un script en su propio hilo, con su radio,
+# botones, pines, pantalla, UART y carpeta de archivos
+import builtins
+import os
+import queue
+import struct
+import sys
+import tempfile
+import threading
+import traceback
+from contextlib import contextmanager
+
+from simulador.eter import RadioVirtual
+
+_local = threading.local()
+MAX_CRUDO = 1 << 20     # bytes de salida USB cruda guardados sin leer
+_open_original  = builtins.open
+_print_original = builtins.print
+
+
+class Detenido(BaseException):
+    """Se lanza dentro del script cuando el simulador detiene el dispositivo."""
+
+
+class Reinicio(BaseException):
+    """microbit.reset(): el script vuelve a empezar."""
+
+
+def actual():
+    """Dispositivo del hilo actual (None fuera de un dispositivo)."""
+    return getattr(_local, 'dispositivo', None)
+
+
+def _requerir():
+    disp = actual()
+    if disp is None:
+        raise RuntimeError("Codigo de micro:bit fuera de un dispositivo simulado")
+    return disp
+
+
+# ----------------------------------------------------------------------
+# open() y print() por dispositivo
+# ----------------------------------------------------------------------
+def _open(file, mode='r', *args, **kwargs):
+    disp = actual()
+    if disp is not None and isinstance(file, str) and not os.path.isabs(file):
+        file = os.path.join(disp.carpeta, file)
+    return _open_original(file, mode, *args, **kwargs)
+
+
+def _print(*args, sep=' ', end='\n', file=None, flush=False):
+    disp = actual()
+    if disp is None or file is not None:
+        return _print_original(*args, sep=sep, end=end, file=file, flush=flush)
+    disp.escribir_usb(sep.join(str(a) for a in args) + end)
+
+
+def instalar():
+    """Deja importables los modulos de micro:bit simulados y parchea open/print."""
+    modulos = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modulos')
+    if modulos not in sys.path:
+        sys.path.insert(0, modulos)
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if raiz not in sys.path:
+        sys.path.append(raiz)     # microbitml.py
+    builtins.open  = _open
+    builtins.print = _print
+
+
+class Boton:
+    def __init__(self, disp):
+        self._disp      = disp
+        self._hasta     = -1.0
+        self._presiones = 0
+        self._fue       = False
+
+    def pulsar(self, ms):
+        self._hasta = self._disp.eter.ahora() + ms
+        self._presiones += 1
+        self._fue = True
+
+    def is_pressed(self):
+        return self._disp.eter.ahora() < self._hasta
+
+    def was_pressed(self):
+        fue, self._fue = self._fue, False
+        return fue
+
+    def get_presses(self):
+        n, self._presiones = self._presiones, 0
+        return n
+
+
+class Dispositivo:
+    """Micro:bit simulado.
+
+    Corre `script` (ruta a un .py de micro:bit) o `objetivo` (callable) en un hilo
+    propio. Todo lo que el codigo importa de microbit/radio/machine/music actua sobre
+    este dispositivo. print() va a la salida USB (ver leer_usb) y open() a `carpeta`.
+    """
+
+    def __init__(self, eter, script=None, objetivo=None, nombre=None, indice=0,
+                 carpeta=None, eco=True):
+        self.eter     = eter
+        self.script   = script
+        self.objetivo = objetivo
+        self.indice   = indice
+        self.nombre   = nombre or f"mb{indice:02d}"
+        self.uid      = struct.pack('>Q', 0x5100000000000000 + indice)
+        self.carpeta  = carpeta or tempfile.mkdtemp(prefix=f"sim_{self.nombre}_")
+        self.eco      = eco
+        self.radio    = RadioVirtual(eter)
+        self.botones  = {'a': Boton(self), 'b': Boton(self)}
+        self.tocados  = set()           # pines tocados: 'pin0', 'pin1', 'pin2', 'pin_logo'
+        self.digital  = {}
+        self.pantalla = ''
+        self.error    = None
+        self._usb     = queue.Queue()   # lineas que el dispositivo imprime
+        self._parcial = ''
+        self._crudo   = bytearray()     # todo lo que sale por USB, tal cual
+        self._crudo_lock = threading.Lock()
+        self._uart    = bytearray()     # bytes que la PC manda al dispositivo
+        self._uart_lock = threading.Lock()
+        self._detener = False
+        self._hilo    = None
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+    @contextmanager
+    def contexto(self):
+        """Ejecuta codigo de micro:bit en el hilo actual como si fuera este dispositivo."""
+        anterior = actual()
+        _local.dispositivo = self
+        try:
+            yield self
+        finally:
+            _local.dispositivo = anterior
+
+    def arrancar(self):
+        self._hilo = threading.Thread(target=self._correr, name=self.nombre, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self, espera=2.0):
+        self._detener = True
+        if self._hilo:
+            self._hilo.join(espera)
+
+    def vivo(self):
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def _correr(self):
+        with self.contexto():
+            while not self._detener:
+                try:
+                    if self.objetivo:
+                        self.objetivo()
+                    else:
+                        self._ejecutar_script()
+                    return
+                except Reinicio:
+                    self.radio.off()
+                    continue
+                except Detenido:
+                    return
+                except Exception:
+                    self.error = traceback.format_exc()
+                    _print_original(f"[{self.nombre}] ERROR\n{self.error}", file=sys.stderr)
+                    return
+
+    def _ejecutar_script(self):
+        with _open_original(self.script, 'r', encoding='utf-8') as f:
+            codigo = compile(f.read(), self.script, 'exec')
+        carpeta = os.path.dirname(os.path.abspath(self.script))
+        if carpeta not in sys.path:
+            sys.path.append(carpeta)
+        exec(codigo, {'__name__': '__main__', '__file__': self.script})
+
+    def dormir(self, ms):
+        if self._detener:
+            raise Detenido()
+        self.eter.dormir(ms)
+        if self._detener:
+            raise Detenido()
+
+    # ------------------------------------------------------------------
+    # Entradas: botones, pines, UART
+    # ------------------------------------------------------------------
+    def pulsar(self, boton, ms=100):
+        """Pulsa el boton 'a' o 'b' durante ms (virtuales)."""
+        self.botones[boton].pulsar(ms)
+
+    def tocar(self, pin, tocado=True):
+        """Toca o suelta un pin ('pin0', 'pin1', 'pin2', 'pin_logo')."""
+        if tocado:
+            self.tocados.add(pin)
+        else:
+            self.tocados.discard(pin)
+
+    def escribir_uart(self, datos):
+        """La PC escribe en el puerto serie del dispositivo."""
+        if isinstance(datos, str):
+            datos = datos.encode('utf-8')
+        with self._uart_lock:
+            self._uart.extend(datos)
+
+    def uart_any(self):
+        with self._uart_lock:
+            return len(self._uart)
+
+    def uart_read(self, n=None):
+        with self._uart_lock:
+            if not self._uart:
+                return None
+            n = len(self._uart) if n is None else n
+            datos = bytes(self._uart[:n])
+            del self._uart[:n]
+            return datos
+
+    def uart_readline(self):
+        with self._uart_lock:
+            if not self._uart:
+                return None
+            fin = self._uart.find(b'\n')
+            fin = len(self._uart) if fin < 0 else fin + 1
+            datos = bytes(self._uart[:fin])
+            del self._uart[:fin]
+            return datos
+
+    # ------------------------------------------------------------------
+    # Salida USB (print y uart.write)
+    # ------------------------------------------------------------------
+    def escribir_usb(self, texto):
+        with self._crudo_lock:
+            self._crudo += texto.encode('utf-8') if isinstance(texto, str) else texto
+            if len(self._crudo) > MAX_CRUDO:
+                del self._crudo[:len(self._crudo) - MAX_CRUDO]
+        if isinstance(texto, (bytes, bytearray)):
+            # Tramas binarias (con 0x00): solo en la salida cruda
+            if b'\x00' in texto:
+                return
+            texto = bytes(texto).decode('utf-8', 'replace')
+        self._parcial += texto
+        while '\n' in self._parcial:
+            linea, self._parcial = self._parcial.split('\n', 1)
+            linea = linea.rstrip('\r')
+            self._usb.put(linea)
+            if self.eco:
+                _print_original(f"[{self.nombre}] {linea}")
+
+    def leer_usb(self, timeout=None):
+        """Proxima linea impresa por el dispositivo, o None si no hay a tiempo."""
+        try:
+            return self._usb.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def leer_usb_crudo(self):
+        """Bytes que salieron por USB desde la ultima llamada, incluidas las tramas binarias."""
+        with self._crudo_lock:
+            datos = bytes(self._crudo)
+            self._crudo.clear()
+            return datos
@@ -0,0 +1,181 @@
+# simulador/eter.py
+# Eter de radio compartido: reparte las tramas entre las radios virtuales con
+# perdida, latencia, colisiones y el tope de cola de cada radio
+import random
+import threading
+import time
+
+# Direccion y parametros por defecto de la radio del micro:bit
+DIR_DEFAULT   = 0x75626974
+CANAL_DEFAULT = 7
+LARGO_DEFAULT = 32
+COLA_DEFAULT  = 3
+
+# Tiempo en el aire a 1 Mbit/s: 8 us por byte, mas preambulo/direccion/CRC
+US_POR_BYTE   = 8
+BYTES_EXTRA   = 10
+
+
+class _Tx:
+    __slots__ = ('origen', 'trama', 'canal', 'address', 'group', 'inicio', 'fin', 'colision')
+
+    def __init__(self, origen, trama, canal, address, group, inicio, fin):
+        self.origen   = origen
+        self.trama    = trama
+        self.canal    = canal
+        self.address  = address
+        self.group    = group
+        self.inicio   = inicio
+        self.fin      = fin
+        self.colision = False
+
+
+class Eter:
+    """Medio de radio compartido por todos los dispositivos simulados.
+
+    perdida: probabilidad de perder cada trama en cada receptor (0..1)
+    latencia_ms / jitter_ms: demora entre el fin de la transmision y la llegada
+    colisiones: dos tramas del mismo canal que se superponen en el aire se pierden
+    escala: >1 acelera el tiempo virtual (sleep y running_time)
+    """
+
+    def __init__(self, perdida=0.0, latencia_ms=1.0, jitter_ms=0.0, colisiones=True,
+                 escala=1.0, semilla=None):
+        self.perdida     = perdida
+        self.latencia_ms = latencia_ms
+        self.jitter_ms   = jitter_ms
+        self.colisiones  = colisiones
+        self.escala      = escala
+        self._azar       = random.Random(semilla)
+        self._lock       = threading.Lock()
+        self._radios     = []
+        self._aire       = []          # transmisiones recientes, para detectar choques
+        self._t0         = time.monotonic()
+        self.stats = {'enviadas': 0, 'entregadas': 0, 'filtradas': 0,
+                      'perdidas': 0, 'colisiones': 0, 'cola_llena': 0}
+
+    # ------------------------------------------------------------------
+    # Tiempo virtual
+    # ------------------------------------------------------------------
+    def ahora(self):
+        """Milisegundos virtuales desde que se creo el eter."""
+        return (time.monotonic() - self._t0) * 1000.0 * self.escala
+
+    def dormir(self, ms):
+        if ms > 0:
+            time.sleep(ms / 1000.0 / self.escala)
+
+    # ------------------------------------------------------------------
+    # Radios
+    # ------------------------------------------------------------------
+    def conectar(self, radio):
+        with self._lock:
+            self._radios.append(radio)
+
+    def transmitir(self, origen, trama):
+        with self._lock:
+            # Una radio transmite de a una trama: la siguiente sale cuando termina la anterior
+            inicio = max(self.ahora(), origen._fin_tx)
+            fin = inicio + (len(trama) + BYTES_EXTRA) * US_POR_BYTE / 1000.0
+            origen._fin_tx = fin
+            tx = _Tx(origen, trama, origen.channel, origen.address, origen.group, inicio, fin)
+            self.stats['enviadas'] += 1
+            if self.colisiones:
+                # Se olvidan las transmisiones que ya terminaron hace rato
+                self._aire = [o for o in self._aire if o.fin > inicio - 1.0]
+                for otra in self._aire:
+                    if otra.canal == tx.canal and otra.origen is not origen and otra.fin > inicio:
+                        otra.colision = tx.colision = True
+                self._aire.append(tx)
+            for radio in self._radios:
+                if radio is origen or not radio.encendida:
+                    continue
+                llegada = fin + self.latencia_ms
+                if self.jitter_ms:
+                    llegada += self._azar.random() * self.jitter_ms
+                    # El jitter no adelanta una trama a otra anterior del mismo origen
+                    for previa, otra in radio._en_vuelo:
+                        if otra.origen is origen and previa > llegada:
+                            llegada = previa
+                radio._en_vuelo.append((llegada, tx))
+
+    def entregar(self, radio):
+        """Pasa a la cola de la radio las tramas que ya llegaron."""
+        ahora = self.ahora()
+        with self._lock:
+            if not radio._en_vuelo:
+                return
+            listas = [e for e in radio._en_vuelo if e[0] <= ahora]
+            if not listas:
+                return
+            radio._en_vuelo = [e for e in radio._en_vuelo if e[0] > ahora]
+            listas.sort(key=lambda e: e[0])
+            for _, tx in listas:
+                if (tx.canal != radio.channel or tx.address != radio.address
+                        or tx.group != radio.group or len(tx.trama) > radio.length):
+                    motivo = 'filtradas'
+                elif tx.colision:
+                    motivo = 'colisiones'
+                elif self.perdida and self._azar.random() < self.perdida:
+                    motivo = 'perdidas'
+                elif len(radio.cola) >= radio.queue:
+                    motivo = 'cola_llena'
+                else:
+                    radio.cola.append(tx.trama)
+                    motivo = 'entregadas'
+                self.stats[motivo] += 1
+                radio.stats[motivo] += 1
+
+
+class RadioVirtual:
+    """Estado de la radio de un dispositivo (lo que guarda radio.config)."""
+
+    def __init__(self, eter):
+        self.eter      = eter
+        self.encendida = False
+        self.channel   = CANAL_DEFAULT
+        self.address   = DIR_DEFAULT
+        self.group     = 0
+        self.length    = LARGO_DEFAULT
+        self.queue     = COLA_DEFAULT
+        self.power     = 6
+        self.data_rate = 1
+        self.cola      = []
+        self._en_vuelo = []
+        self._fin_tx   = 0.0        # fin en el aire de la ultima trama enviada
+        self.stats = {'enviadas': 0, 'entregadas': 0, 'filtradas': 0,
+                      'perdidas': 0, 'colisiones': 0, 'cola_llena': 0}
+        eter.conectar(self)
+
+    def config(self, **kwargs):
+        for clave, valor in kwargs.items():
+            if clave not in ('channel', 'address', 'group', 'length', 'queue', 'power', 'data_rate'):
+                raise TypeError(f"unexpected keyword argument '{clave}'")
+            setattr(self, clave, valor)
+
+    def reset(self):
+        self.config(channel=CANAL_DEFAULT, address=DIR_DEFAULT, group=0,
+                    length=LARGO_DEFAULT, queue=COLA_DEFAULT, power=6, data_rate=1)
+
+    def on(self):
+        self.encendida = True
+
+    def off(self):
+        self.encendida = False
+        self.cola = []
+        self._en_vuelo = []
+
+    def enviar(self, trama):
+        if not self.encendida:
+            raise ValueError("radio is not enabled")
+        trama = bytes(trama[:self.length])
+        self.stats['enviadas'] += 1
+        self.eter.transmitir(self, trama)
+
+    def recibir(self):
+        if not self.encendida:
+            raise ValueError("radio is not enabled")
+        self.eter.entregar(self)
+        if self.cola:
+            return self.cola.pop(0)
+        return None
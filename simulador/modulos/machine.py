@@ -0,0 +1,15 @@
+# simulador/modulos/machine.py
+# Modulo machine simulado
+from simulador.dispositivo import _requerir, Reinicio
+
+
+def unique_id():
+    return _requerir().uid
+
+
+def reset():
+    raise Reinicio()
+
+
+def freq():
+    return 64000000
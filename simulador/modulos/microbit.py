@@ -0,0 +1,157 @@
+# simulador/modulos/microbit.py
+# Modulo microbit simulado: cada llamada actua sobre el dispositivo del hilo actual
+from simulador.dispositivo import _requerir, Reinicio
+
+
+def sleep(ms):
+    _requerir().dormir(ms)
+
+
+def running_time():
+    return int(_requerir().eter.ahora())
+
+
+def reset():
+    raise Reinicio()
+
+
+def panic(n=0):
+    raise RuntimeError(f"panic({n})")
+
+
+def temperature():
+    return 21
+
+
+class Image:
+    def __init__(self, *args):
+        if len(args) == 1 and isinstance(args[0], str):
+            self._filas = args[0].rstrip(':').split(':')
+        elif len(args) >= 2:
+            self._filas = ['0' * args[0]] * args[1]
+        else:
+            self._filas = ['00000'] * 5
+
+    def __repr__(self):
+        return "Image('{}:')".format(':'.join(self._filas))
+
+    def __str__(self):
+        return repr(self)
+
+
+for _nombre, _patron in (
+        ('HEART', '09090:99999:99999:09990:00900'),
+        ('HEART_SMALL', '00000:09090:09990:00900:00000'),
+        ('HAPPY', '00000:09090:00000:90009:09990'),
+        ('SAD', '00000:09090:00000:09990:90009'),
+        ('YES', '00000:00009:00090:90900:09000'),
+        ('NO', '90009:09090:00900:09090:90009'),
+        ('DUCK', '09900:99900:09999:09990:00000'),
+        ('ARROW_N', '00900:09990:90909:00900:00900'),
+        ('ARROW_E', '00900:00090:99999:00090:00900'),
+        ('ARROW_S', '00900:00900:90909:09990:00900'),
+        ('ARROW_W', '00900:09000:99999:09000:00900'),
+        ('SQUARE', '99999:90009:90009:90009:99999'),
+        ('SMILE', '00000:00000:00000:90009:09990'),
+        ('CONFUSED', '00000:09090:00000:09090:90909'),
+        ('ANGRY', '90009:09090:00000:99999:90909'),
+        ('SKULL', '09990:90909:99999:09990:09990')):
+    setattr(Image, _nombre, Image(_patron))
+
+
+class _Display:
+    def show(self, valor, delay=400, wait=True, loop=False, clear=False):
+        _requerir().pantalla = str(valor)
+
+    def scroll(self, texto, delay=150, wait=True, loop=False, monospace=False):
+        _requerir().pantalla = str(texto)
+
+    def clear(self):
+        _requerir().pantalla = ''
+
+    def set_pixel(self, x, y, brillo):
+        pass
+
+    def get_pixel(self, x, y):
+        return 0
+
+    def on(self):
+        pass
+
+    def off(self):
+        pass
+
+    def is_on(self):
+        return True
+
+    def read_light_level(self):
+        return 0
+
+
+class _Boton:
+    def __init__(self, nombre):
+        self._nombre = nombre
+
+    def is_pressed(self):
+        return _requerir().botones[self._nombre].is_pressed()
+
+    def was_pressed(self):
+        return _requerir().botones[self._nombre].was_pressed()
+
+    def get_presses(self):
+        return _requerir().botones[self._nombre].get_presses()
+
+
+class _Pin:
+    def __init__(self, nombre):
+        self._nombre = nombre
+
+    def is_touched(self):
+        return self._nombre in _requerir().tocados
+
+    def read_digital(self):
+        disp = _requerir()
+        return disp.digital.get(self._nombre, 1 if self._nombre in disp.tocados else 0)
+
+    def write_digital(self, valor):
+        _requerir().digital[self._nombre] = valor
+
+    def read_analog(self):
+        return 0
+
+    def write_analog(self, valor):
+        pass
+
+    def set_touch_mode(self, modo):
+        pass
+
+
+class _Uart:
+    ODD = 1
+    EVEN = 0
+
+    def init(self, baudrate=9600, bits=8, parity=None, stop=1, tx=None, rx=None):
+        pass
+
+    def any(self):
+        return _requerir().uart_any() > 0
+
+    def read(self, n=None):
+        return _requerir().uart_read(n)
+
+    def readline(self):
+        return _requerir().uart_readline()
+
+    def write(self, datos):
+        _requerir().escribir_usb(datos)
+        return len(datos)
+
+
+display  = _Display()
+button_a = _Boton('a')
+button_b = _Boton('b')
+pin0     = _Pin('pin0')
+pin1     = _Pin('pin1')
+pin2     = _Pin('pin2')
+pin_logo = _Pin('pin_logo')
+uart     = _Uart()
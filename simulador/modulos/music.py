@@ -0,0 +1,23 @@
+# simulador/modulos/music.py
+# Modulo music simulado: no suena, pero respeta las esperas
+from simulador.dispositivo import _requerir
+
+BA_DING = ['b5:1', 'e6:3']
+POWER_UP = ['g4:1', 'c5', 'e5', 'g5:2', 'e5:1', 'g5:3']
+
+
+def pitch(frequency, duration=-1, pin=None, wait=True):
+    if wait and duration > 0:
+        _requerir().dormir(duration)
+
+
+def play(music, pin=None, wait=True, loop=False):
+    pass
+
+
+def stop(pin=None):
+    pass
+
+
+def set_tempo(ticks=4, bpm=120):
+    pass
@@ -0,0 +1,54 @@
+# simulador/modulos/radio.py
+# Modulo radio simulado: la radio del dispositivo del hilo actual, sobre el eter
+from simulador.dispositivo import _requerir
+
+RATE_1MBIT = 1
+RATE_2MBIT = 2
+
+# Cabecera que MicroPython antepone a send(str)
+_TXT = b'\x01\x00\x01'
+
+
+def on():
+    _requerir().radio.on()
+
+
+def off():
+    _requerir().radio.off()
+
+
+def config(**kwargs):
+    _requerir().radio.config(**kwargs)
+
+
+def reset():
+    _requerir().radio.reset()
+
+
+def send_bytes(mensaje):
+    _requerir().radio.enviar(mensaje)
+
+
+def send(mensaje):
+    _requerir().radio.enviar(_TXT + str(mensaje).encode('utf-8'))
+
+
+def receive_bytes():
+    return _requerir().radio.recibir()
+
+
+def receive():
+    trama = _requerir().radio.recibir()
+    if trama is None:
+        return None
+    if trama[:3] != _TXT:
+        raise ValueError("received packet is not a string")
+    return trama[3:].decode('utf-8')
+
+
+def receive_full():
+    disp = _requerir()
+    trama = disp.radio.recibir()
+    if trama is None:
+        return None
+    return (trama, -50, int(disp.eter.ahora() * 1000))